@@ -0,0 +1,84 @@
+"""Admission control: per-client rate limiting and a global concurrency cap.
+
+Both limiters answer immediately or after a short bounded wait, so an
+overloaded server sheds requests fast instead of letting them queue
+until clients time out.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+class TokenBucketLimiter:
+    """Token bucket per client key, refilled at `rate` tokens per second"""
+
+    def __init__(self, rate, burst, max_clients=100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # key -> [tokens, last refill time]; least recently seen first
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def allow(self, key):
+        """(True, 0) if the request may proceed, else (False, seconds to wait)"""
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [self.burst, now]
+                if len(self.buckets) > self.max_clients:
+                    # Forgotten clients come back with a full bucket
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0
+            return False, (1 - bucket[0]) / self.rate
+
+class ConcurrencyLimiter:
+    """At most `max_active` requests run; up to `max_queue` more may wait briefly"""
+
+    def __init__(self, max_active, max_queue, queue_timeout):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """None once admitted, else the reason the request was shed"""
+        with self.condition:
+            if self.active < self.max_active:
+                self.active += 1
+                return None
+            if self.waiting >= self.max_queue:
+                return 'queue_full'
+            self.waiting += 1
+            try:
+                admitted = self.condition.wait_for(lambda: self.active < self.max_active,
+                                                   timeout=self.queue_timeout)
+            finally:
+                self.waiting -= 1
+            if not admitted:
+                return 'queue_timeout'
+            self.active += 1
+            return None
+
+    def release(self):
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+    def stats(self):
+        with self.condition:
+            return {'active': self.active, 'waiting': self.waiting,
+                    'max_active': self.max_active, 'max_queue': self.max_queue}
+
+def retry_after(seconds):
+    """Retry-After header value: whole seconds, at least 1"""
+    return str(max(1, math.ceil(seconds)))
@@ -0,0 +1,238 @@
+"""Offline analytics over interaction logs.
+
+Streams NDJSON logs (plain or gzipped shards, as written by
+interaction_log.py) through generators and re-scores every message with
+the current knowledge base. Memory stays constant however many weeks of
+logs are read: intents are counted exactly, unmatched n-grams with a
+bounded heavy-hitters summary and latencies in a fixed log-scale
+histogram. Shards are processed in parallel, one per worker process,
+and the partial summaries are merged.
+
+    python analytics.py logs/interactions*.ndjson* --workers 4
+    python analytics.py logs/*.gz --knowledge-base knowledge_base.json --json
+    python analytics.py logs/*.gz --tenant mit --knowledge-base tenants/mit.json
+"""
+import argparse
+import gzip
+import json
+import math
+import multiprocessing
+import os
+import sys
+from itertools import islice
+
+from ranking import STOPWORDS
+
+CHUNK_SIZE = 1000
+
+def read_lines(path):
+    """Lines of a log shard, decompressing .gz on the fly"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        yield from f
+
+def parse_records(lines, tenant=None):
+    """Decoded log records of one tenant; torn or corrupt lines are skipped"""
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if (isinstance(record, dict) and isinstance(record.get('message'), str)
+                and record.get('tenant') == tenant):
+            yield record
+
+def chunked(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def ngrams(processed_input, max_n=3):
+    """Word n-grams, skipping those made only of stopwords"""
+    tokens = processed_input.split()
+    for n in range(1, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            gram = tokens[i:i + n]
+            if not STOPWORDS.issuperset(gram):
+                yield ' '.join(gram)
+
+class HeavyHitters:
+    """Misra-Gries summary: approximate top counts in bounded memory"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, item, count=1):
+        counts = self.counts
+        if item in counts or len(counts) < self.capacity:
+            counts[item] = counts.get(item, 0) + count
+            return
+        # Full: charge every tracked item instead of adding a new one
+        smallest = min(count, min(counts.values()))
+        self.counts = {key: value - smallest for key, value in counts.items() if value > smallest}
+        if count > smallest:
+            self.counts[item] = count - smallest
+
+    def merge(self, other):
+        for item, count in other.counts.items():
+            self.counts[item] = self.counts.get(item, 0) + count
+        if len(self.counts) > self.capacity:
+            cutoff = sorted(self.counts.values(), reverse=True)[self.capacity]
+            self.counts = {key: value - cutoff for key, value in self.counts.items() if value > cutoff}
+
+    def top(self, k):
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+class LatencyHistogram:
+    """Fixed log-scale buckets, so percentiles need no stored samples"""
+    # Buckets grow by 5%, so a reported percentile is within 5% of the true value
+    GROWTH = 1.05
+    MIN_MS = 0.01
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+
+    def add(self, latency_ms):
+        bucket = 0 if latency_ms <= self.MIN_MS else math.ceil(math.log(latency_ms / self.MIN_MS, self.GROWTH))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.total += 1
+
+    def merge(self, other):
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+        self.total += other.total
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile, in ms"""
+        if not self.total:
+            return None
+        rank = math.ceil(self.total * pct / 100)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return round(self.MIN_MS * self.GROWTH ** bucket, 3)
+
+class Summary:
+    """Mergeable aggregates for any number of log records"""
+
+    def __init__(self, ngram_capacity=1000):
+        self.records = 0
+        self.intents = {}
+        self.fallbacks = 0
+        self.logged_fallbacks = 0
+        self.changed = 0
+        self.unmatched = HeavyHitters(ngram_capacity)
+        self.latency = LatencyHistogram()
+
+    def add_chunk(self, bot, records):
+        """Re-score a chunk of records, each distinct message once"""
+        processed = [bot.preprocess_input(record['message']) for record in records]
+        matches = bot.match_many(set(processed))
+        for record, processed_input in zip(records, processed):
+            intent = matches[processed_input][0]
+            self.records += 1
+            if intent is None:
+                self.fallbacks += 1
+                for gram in ngrams(processed_input):
+                    self.unmatched.add(gram)
+            else:
+                self.intents[intent] = self.intents.get(intent, 0) + 1
+            if record.get('intent') is None:
+                self.logged_fallbacks += 1
+            if record.get('intent') != intent:
+                self.changed += 1
+            latency = record.get('latency_ms')
+            if isinstance(latency, (int, float)):
+                self.latency.add(latency)
+
+    def merge(self, other):
+        self.records += other.records
+        for intent, count in other.intents.items():
+            self.intents[intent] = self.intents.get(intent, 0) + count
+        self.fallbacks += other.fallbacks
+        self.logged_fallbacks += other.logged_fallbacks
+        self.changed += other.changed
+        self.unmatched.merge(other.unmatched)
+        self.latency.merge(other.latency)
+
+    def report(self, top=20):
+        records = self.records or 1
+        return {
+            'records': self.records,
+            'intents': dict(sorted(self.intents.items(), key=lambda item: (-item[1], item[0]))),
+            'fallback_rate': round(self.fallbacks / records, 4),
+            'logged_fallback_rate': round(self.logged_fallbacks / records, 4),
+            'intent_changed': self.changed,
+            'top_unmatched_ngrams': self.unmatched.top(top),
+            'latency_ms': {'p50': self.latency.percentile(50), 'p90': self.latency.percentile(90),
+                           'p99': self.latency.percentile(99), 'max': self.latency.percentile(100)},
+        }
+
+# One chatbot per worker process, built by the pool initializer
+worker_bot = None
+worker_tenant = None
+
+def init_worker(knowledge_base, tenant=None):
+    global worker_bot, worker_tenant
+    from college_chatbot import create_chatbot
+    # Same CHATBOT_* matcher options as the server, so re-scoring agrees with it
+    worker_bot = create_chatbot(knowledge_base)
+    worker_tenant = tenant
+
+def summarize_shard(path):
+    """Aggregate one log shard"""
+    summary = Summary()
+    for chunk in chunked(parse_records(read_lines(path), worker_tenant), CHUNK_SIZE):
+        summary.add_chunk(worker_bot, chunk)
+    return summary
+
+def analyze(paths, knowledge_base, workers=1, tenant=None):
+    """Merged Summary over every shard"""
+    total = Summary()
+    if workers <= 1 or len(paths) <= 1:
+        init_worker(knowledge_base, tenant)
+        for path in paths:
+            total.merge(summarize_shard(path))
+        return total
+    with multiprocessing.Pool(workers, init_worker, (knowledge_base, tenant)) as pool:
+        for summary in pool.imap_unordered(summarize_shard, paths):
+            total.merge(summary)
+    return total
+
+def format_report(report):
+    lines = [f"📊 {report['records']} interactions",
+             f"   fallback rate {report['fallback_rate']:.1%} "
+             f"(logged {report['logged_fallback_rate']:.1%}, {report['intent_changed']} re-scored differently)",
+             "   latency ms " + ' '.join(f"{key}={value}" for key, value in report['latency_ms'].items()),
+             "", "Intents:"]
+    lines += [f"  {count:>8}  {intent}" for intent, count in report['intents'].items()]
+    lines += ["", "Top unmatched n-grams:"]
+    lines += [f"  {count:>8}  {gram}" for gram, count in report['top_unmatched_ngrams']]
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('logs', nargs='+', help='NDJSON log shards (.gz allowed)')
+    parser.add_argument('--knowledge-base', default=os.environ.get(
+        'CHATBOT_KNOWLEDGE_BASE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge_base.json')))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--top', type=int, default=20, help='unmatched n-grams to list')
+    parser.add_argument('--tenant', help="only this college's interactions (default: the untenanted ones)")
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    report = analyze(args.logs, args.knowledge_base, args.workers, args.tenant).report(args.top)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print(format_report(report))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""ASGI entry point for production serving.
+
+Run the multi-worker server with:  python asgi.py
+or point any ASGI server at it:    uvicorn asgi:application --workers 4
+
+Settings (environment variables):
+    PORT                  listen port (default 5000)
+    CHATBOT_WORKERS       worker processes (default: CPU count)
+    CHATBOT_KEEPALIVE     keep-alive timeout in seconds (default 5)
+    CHATBOT_THREADS       request threads per worker (default 10)
+"""
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from main import app
+
+CHATBOT_THREADS = int(os.environ.get('CHATBOT_THREADS', 10))
+
+# The Flask routes run in the adapter's thread pool, so one worker
+# serves many connections concurrently
+application = WSGIMiddleware(app, workers=CHATBOT_THREADS)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    port = int(os.environ.get('PORT', 5000))
+    workers = int(os.environ.get('CHATBOT_WORKERS', os.cpu_count() or 1))
+    keepalive = int(os.environ.get('CHATBOT_KEEPALIVE', 5))
+
+    print("🤖 College Chatbot is starting (ASGI)...")
+    print(f"📡 Server will run on http://localhost:{port} with {workers} workers")
+    print("💡 Press Ctrl+C to stop the server")
+
+    uvicorn.run('asgi:application', host='0.0.0.0', port=port, workers=workers,
+                timeout_keep_alive=keepalive, access_log=False)
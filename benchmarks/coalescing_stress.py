@@ -0,0 +1,101 @@
+"""Stress check for request coalescing: a burst of identical questions.
+
+Each round, `--threads` threads are released together and ask the same
+few questions, as a results-day spike would. The burst runs with
+coalescing off and on. The script reports how many matches were actually
+computed and how long the burst took, and checks that every thread got
+the same answer as a plain, single-threaded match.
+
+    python benchmarks/coalescing_stress.py --threads 64 --rounds 50 --intents 10000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_knowledge_base import generate, sample_queries
+from college_chatbot import CollegeChatbot, DEFAULT_KNOWLEDGE_BASE
+
+QUESTIONS = ['what are the fees', 'admission', 'how do I aply for engineering', 'tuition per year']
+
+def burst(chatbot, threads, rounds, expected):
+    """Seconds for all rounds, and how many times the matcher really ran"""
+    computed = [0]
+    match_many = chatbot.match_many
+    counter_lock = threading.Lock()
+
+    def counted(processed_inputs):
+        with counter_lock:
+            computed[0] += 1
+        return match_many(processed_inputs)
+    chatbot.match_many = counted
+
+    barrier = threading.Barrier(threads)
+    failures = []
+
+    def worker(i):
+        question = expected_inputs[i % len(expected_inputs)]
+        for _ in range(rounds):
+            barrier.wait()
+            result = chatbot.match(question)
+            if result != expected[question]:
+                failures.append((question, result))
+
+    expected_inputs = list(expected)
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    del chatbot.match_many
+    assert not failures, failures[:5]
+    return elapsed, computed[0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=64)
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--ranking', default='bm25', choices=['keyword', 'bm25'])
+    parser.add_argument('--semantic', action='store_true', help='enable the semantic matcher too')
+    parser.add_argument('--intents', type=int, default=0,
+                        help='use a synthetic knowledge base this large instead of the bundled one')
+    args = parser.parse_args()
+
+    knowledge_base = DEFAULT_KNOWLEDGE_BASE
+    questions = QUESTIONS
+    if args.intents:
+        generated = generate(args.intents)
+        questions = sample_queries(generated, len(QUESTIONS))
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+            json.dump(generated, f)
+        knowledge_base = f.name
+
+    print(f"{args.threads} threads x {args.rounds} rounds, {len(questions)} distinct questions, "
+          f"ranking={args.ranking}{', semantic' if args.semantic else ''}, "
+          f"{args.intents or 'bundled'} intents")
+    print(f"{'coalescing':<12}{'requests':>10}{'computed':>10}{'coalesced':>11}{'burst ms':>10}")
+    for coalesce in (False, True):
+        chatbot = CollegeChatbot(knowledge_base, ranking=args.ranking, semantic=args.semantic,
+                                 semantic_budget=60, coalesce=coalesce)
+        expected = {}
+        for question in questions:
+            processed_input = chatbot.preprocess_input(question)
+            expected[processed_input] = chatbot.match_many([processed_input])[processed_input]
+        elapsed, computed = burst(chatbot, args.threads, args.rounds, expected)
+        requests = args.threads * args.rounds
+        coalesced = chatbot.single_flight.stats()['coalesced'] if coalesce else 0
+        assert computed + coalesced == requests
+        print(f"{'on' if coalesce else 'off':<12}{requests:>10}{computed:>10}{coalesced:>11}"
+              f"{elapsed / args.rounds * 1000:>10.2f}")
+    if args.intents:
+        os.unlink(knowledge_base)
+
+if __name__ == '__main__':
+    main()
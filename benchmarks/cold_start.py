@@ -0,0 +1,96 @@
+"""Time to first response of a fresh process, with and without a snapshot.
+
+Each run starts a new interpreter that imports the app (building or
+loading the chatbot), then answers one /chat request. The knowledge
+base is already compiled to SQLite in both cases, so the difference is
+the index building a snapshot skips.
+
+Run from the repository root:  python benchmarks/cold_start.py [--json]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate_knowledge_base import generate
+from knowledge_base import compile_knowledge_base
+
+CHILD = '''
+import json, time
+start = time.perf_counter()
+import main
+main.app.test_client().post('/chat', json={'message': 'fees'})
+print(json.dumps({'in_process': time.perf_counter() - start, 'build': main.chatbot.build_seconds,
+                  'from_snapshot': main.chatbot.from_snapshot}))
+'''
+
+def first_response(knowledge_base, snapshot, extra_env):
+    """Timings of one fresh process answering its first request"""
+    env = dict(os.environ, CHATBOT_KNOWLEDGE_BASE=knowledge_base, **extra_env)
+    env.pop('CHATBOT_SNAPSHOT_SECRET', None)
+    if snapshot:
+        env['CHATBOT_SNAPSHOT_SECRET'] = 'cold-start-benchmark'
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    result = json.loads(output.splitlines()[-1])
+    result['wall'] = time.perf_counter() - start
+    return result
+
+def best_of(runs):
+    """Fastest time per measurement across runs, in milliseconds"""
+    return {key: round(min(run[key] for run in runs) * 1000, 1) for key in ('build', 'in_process', 'wall')}
+
+def measure(name, knowledge_base, extra_env, repeat=5):
+    compile_knowledge_base(knowledge_base)
+    rebuild = [first_response(knowledge_base, False, extra_env) for _ in range(repeat)]
+    # The first snapshot run writes the file; the measured ones read it
+    first_response(knowledge_base, True, extra_env)
+    loaded = [first_response(knowledge_base, True, extra_env) for _ in range(repeat)]
+    assert not any(run['from_snapshot'] for run in rebuild) and all(run['from_snapshot'] for run in loaded)
+    return {'knowledge_base': name,
+            'snapshot_bytes': os.path.getsize(os.path.splitext(knowledge_base)[0] + '.snapshot'),
+            'rebuild': best_of(rebuild), 'snapshot': best_of(loaded)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000', help='synthetic knowledge base sizes')
+    parser.add_argument('--semantic', action='store_true', help='also build BM25 and semantic matchers')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+    extra_env = {'CHATBOT_RANKING': 'bm25', 'CHATBOT_SEMANTIC': '1'} if args.semantic else {}
+
+    directory = tempfile.mkdtemp()
+    try:
+        bundled = os.path.join(directory, 'bundled.json')
+        shutil.copy(os.path.join(ROOT, 'knowledge_base.json'), bundled)
+        results = [measure('bundled', bundled, extra_env)]
+        for size in args.sizes.split(','):
+            path = os.path.join(directory, 'kb-%s.json' % size)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(generate(int(size)), f)
+            results.append(measure('%s intents' % size, path, extra_env))
+    finally:
+        shutil.rmtree(directory)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'knowledge base':<16}{'snapshot':>10}{'build ms':>20}{'first reply ms':>22}{'process ms':>22}")
+    print(f"{'':<16}{'MB':>10}{'rebuild / snapshot':>20}{'rebuild / snapshot':>22}{'rebuild / snapshot':>22}")
+    for result in results:
+        rebuild, loaded = result['rebuild'], result['snapshot']
+        print(f"{result['knowledge_base']:<16}{result['snapshot_bytes'] / 1e6:>10.2f}"
+              f"{rebuild['build']:>11.1f} / {loaded['build']:<6.1f}"
+              f"{rebuild['in_process']:>13.1f} / {loaded['in_process']:<6.1f}"
+              f"{rebuild['wall']:>13.1f} / {loaded['wall']:<6.1f}")
+
+if __name__ == '__main__':
+    main()
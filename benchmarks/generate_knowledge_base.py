@@ -0,0 +1,90 @@
+"""Generate synthetic knowledge bases for scaling tests.
+
+Intents are course-level: every department offers courses, and every
+course has one intent per topic (fees, syllabus, duration, ...). Each
+department is its own category ("Engineering/Dept 12"), so a
+10,000-intent base has a few hundred categories. Keywords are built the
+way a real base would list them: course names and codes, topic words
+shared by every course, and department words shared within a category.
+
+    python benchmarks/generate_knowledge_base.py --intents 10000 --output kb-10k.json
+"""
+import argparse
+import json
+import os
+import random
+
+FACULTIES = ['Engineering', 'Business', 'Arts', 'Sciences', 'Medicine', 'Law']
+TOPICS = ['fees', 'syllabus', 'duration', 'eligibility', 'faculty', 'timetable', 'exams',
+          'placements', 'labs', 'credits']
+INTENTS_PER_DEPARTMENT = 40
+SYLLABLES = ['ba', 'ko', 'ri', 'tem', 'lu', 'nor', 'vi', 'sa', 'gen', 'dro', 'mi', 'pla',
+             'qua', 'zen', 'fi', 'tor', 'ex', 'nu', 'ca', 'sy']
+
+def made_up_word(rng, used):
+    """A fresh pronounceable word, unique within the base"""
+    while True:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in used:
+            used.add(word)
+            return word
+
+def generate(n_intents, seed=0):
+    """Knowledge base dict with n_intents intents, same shape as knowledge_base.json"""
+    rng = random.Random(seed)
+    used = set(TOPICS)
+    intents = {}
+    department = 0
+    while len(intents) < n_intents:
+        faculty = FACULTIES[department % len(FACULTIES)]
+        department_word = made_up_word(rng, used)
+        category = '%s/%s' % (faculty, department_word.title())
+        courses_left = INTENTS_PER_DEPARTMENT // len(TOPICS)
+        while courses_left and len(intents) < n_intents:
+            course = made_up_word(rng, used)
+            code = '%s%d' % (department_word[:3], 100 + rng.randrange(900))
+            for topic in TOPICS:
+                if len(intents) >= n_intents:
+                    break
+                name = '%s-%s' % (course, topic)
+                intents[name] = {
+                    'category': category,
+                    'keywords': ['%s %s' % (course, topic), '%s %s' % (code, topic), course, topic,
+                                 department_word],
+                    'response': '%s %s (%s, %s department): details for %s.' % (
+                        course.title(), topic, code.upper(), department_word.title(), faculty)
+                }
+            courses_left -= 1
+        department += 1
+    return {
+        'intents': intents,
+        'fallback_responses': ["I'm not sure about that. Try asking about a course's fees or syllabus."]
+    }
+
+def sample_queries(knowledge_base, n, seed=1):
+    """Questions a student might ask of a generated base, some unanswerable"""
+    rng = random.Random(seed)
+    names = list(knowledge_base['intents'])
+    queries = []
+    for i in range(n):
+        course, topic = rng.choice(names).rsplit('-', 1)
+        queries.append(rng.choice([
+            'what are the %s for %s' % (topic, course),
+            'tell me about %s' % course,
+            '%s %s please' % (course, topic),
+            'how do I get to the cafeteria',
+        ]))
+    return queries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--intents', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(generate(args.intents, args.seed), f, indent=1)
+    print(f"📦 Wrote {args.intents} intents to {os.path.abspath(args.output)}")
+
+if __name__ == '__main__':
+    main()
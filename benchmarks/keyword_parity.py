@@ -0,0 +1,104 @@
+"""Parity check: compiled keyword scoring against the original per-intent loop.
+
+Random questions are built from keywords, fragments of keywords, filler
+words and noise. Each one is scored by the original substring loop and by
+the compiled index, flat and routed through categories. The best intent
+and its score must agree every time. Also times both.
+
+Run from the repository root:  python benchmarks/keyword_parity.py [--inputs 100000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_knowledge_base import generate
+from college_chatbot import CollegeChatbot
+
+FILLER = ['what', 'is', 'the', 'for', 'how', 'much', 'are', 'a', 'do', 'i', 'please', 'of']
+
+def legacy_best_match(responses, processed_input):
+    """The original loop: a substring test per keyword per intent"""
+    best_match = None
+    highest_score = 0
+    for key, data in responses.items():
+        score = 0
+        for keyword in data['keywords']:
+            if keyword in processed_input:
+                # Give higher score for exact matches
+                if keyword == processed_input:
+                    score += 10
+                else:
+                    score += 5
+        if score > highest_score:
+            highest_score = score
+            best_match = key
+    return best_match, highest_score
+
+def random_inputs(keywords, n, seed=0):
+    """Preprocessed-looking questions mixing keywords, fragments and noise"""
+    rng = random.Random(seed)
+    inputs = []
+    for _ in range(n):
+        if rng.random() < 0.1:
+            inputs.append(rng.choice(keywords))
+            continue
+        words = []
+        for _ in range(rng.randint(1, 6)):
+            kind = rng.random()
+            if kind < 0.4:
+                words.append(rng.choice(keywords))
+            elif kind < 0.6:
+                keyword = rng.choice(keywords)
+                start = rng.randrange(len(keyword))
+                words.append(keyword[start:rng.randint(start + 1, len(keyword))].strip() or keyword)
+            elif kind < 0.9:
+                words.append(rng.choice(FILLER))
+            else:
+                words.append(''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(1, 8))))
+        # Glued words make keywords appear inside other words too
+        inputs.append(('' if rng.random() < 0.1 else ' ').join(words))
+    return inputs
+
+def check(name, chatbot, n):
+    """Assert parity on n inputs; return (legacy us, current us) per input"""
+    inputs = random_inputs(list(chatbot.keyword_postings), n)
+    start = time.perf_counter()
+    expected = [legacy_best_match(chatbot.responses, processed_input) for processed_input in inputs]
+    legacy = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = chatbot.score_pending(inputs)
+    current = time.perf_counter() - start
+    for processed_input, want, got in zip(inputs, expected, actual):
+        if tuple(got) != want:
+            sys.exit(f"{name}: mismatch for {processed_input!r}: expected {want}, got {tuple(got)}")
+    return legacy / n * 1e6, current / n * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--inputs', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(generate(1000), f)
+    try:
+        chatbots = [('bundled', CollegeChatbot()),
+                    ('1000 flat', CollegeChatbot(f.name, routing='flat')),
+                    ('1000 routed', CollegeChatbot(f.name, routing='category'))]
+    finally:
+        os.unlink(f.name)
+        os.unlink(os.path.splitext(f.name)[0] + '.db')
+
+    print(f"{'knowledge base':<16}{'inputs':>8}{'legacy us':>12}{'current us':>12}")
+    for name, chatbot in chatbots:
+        legacy, current = check(name, chatbot, args.inputs)
+        print(f"{name:<16}{args.inputs:>8}{legacy:>12.2f}{current:>12.2f}")
+    print('✅ Same best intent and score as the original loop for every input')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Closed-loop HTTP load generator for a running chatbot server.
+
+Each client thread keeps one keep-alive connection open and posts
+questions to /chat back to back.
+
+    python benchmarks/load_test.py --port 5000 --clients 32 --duration 10
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+
+QUESTIONS = ['courses', 'admission', 'fees', 'facilities',
+             'What are the hostel fees?', 'how do I apply for engineering']
+
+def client(host, port, deadline, latencies, errors):
+    """Send requests on one connection until the deadline"""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    i = 0
+    while time.perf_counter() < deadline:
+        body = json.dumps({'message': QUESTIONS[i % len(QUESTIONS)]})
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/chat', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            errors.append('connection')
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def run(host, port, clients, duration):
+    """Drive the server and return a summary dict"""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(host, port, deadline, latencies, errors))
+               for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    result = run(args.host, args.port, args.clients, args.duration)
+    print(json.dumps(result, indent=2))
+
+if __name__ == '__main__':
+    main()
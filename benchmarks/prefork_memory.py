@@ -0,0 +1,108 @@
+"""Startup time and per-worker memory: pre-fork vs independent workers.
+
+For each worker count, starts prefork.py and waits until every worker is
+forked and /health answers. It then reads each worker's memory from
+/proc/<pid>/smaps_rollup. The same is done for N independent processes
+that each import the app themselves, which is what a plain multi-worker
+server does. Linux only.
+
+    python benchmarks/prefork_memory.py --workers 1 2 4 8 16 32 --output prefork.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def memory_kb(pid):
+    """Rss, Pss and private (unshared) memory of a process in kB"""
+    fields = {}
+    with open('/proc/%d/smaps_rollup' % pid) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+def children_of(pid):
+    with open('/proc/%d/task/%d/children' % (pid, pid)) as f:
+        return [int(child) for child in f.read().split()]
+
+def average(samples):
+    return {key: round(sum(sample[key] for sample in samples) / len(samples)) for key in samples[0]}
+
+def measure_prefork(workers, port):
+    env = dict(os.environ, PORT=str(port), CHATBOT_WORKERS=str(workers))
+    started = time.perf_counter()
+    master = subprocess.Popen([sys.executable, 'prefork.py'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if len(children_of(master.pid)) == workers:
+                try:
+                    urllib.request.urlopen('http://127.0.0.1:%d/health' % port, timeout=1).read()
+                    break
+                except OSError:
+                    pass
+            time.sleep(0.005)
+        startup = time.perf_counter() - started
+        # Exercise the workers so the numbers include post-request growth
+        for _ in range(workers * 4):
+            urllib.request.urlopen(urllib.request.Request(
+                'http://127.0.0.1:%d/chat' % port, data=b'{"message": "fees"}',
+                headers={'Content-Type': 'application/json'})).read()
+        worker_memory = [memory_kb(pid) for pid in children_of(master.pid)]
+        return {'startup_s': round(startup, 3), 'master': memory_kb(master.pid),
+                'worker_avg': average(worker_memory)}
+    finally:
+        master.terminate()
+        master.wait()
+
+def measure_independent(workers):
+    code = 'import main, sys; print("ready", flush=True); sys.stdin.read()'
+    started = time.perf_counter()
+    processes = [subprocess.Popen([sys.executable, '-c', code], cwd=ROOT, stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+                 for _ in range(workers)]
+    try:
+        for process in processes:
+            process.stdout.readline()
+        startup = time.perf_counter() - started
+        return {'startup_s': round(startup, 3),
+                'worker_avg': average([memory_kb(process.pid) for process in processes])}
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--port', type=int, default=5199)
+    parser.add_argument('--output', help='write JSON results here')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'workers':>8} {'mode':<12} {'startup s':>10} {'rss kB':>8} {'pss kB':>8} {'private kB':>11}")
+    for workers in args.workers:
+        for mode, result in (('prefork', measure_prefork(workers, args.port)),
+                             ('independent', measure_independent(workers))):
+            memory = result['worker_avg']
+            print(f"{workers:>8} {mode:<12} {result['startup_s']:>10.3f} {memory['rss']:>8} "
+                  f"{memory['pss']:>8} {memory['private']:>11}", flush=True)
+            results.append(dict(result, workers=workers, mode=mode))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
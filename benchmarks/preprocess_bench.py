@@ -0,0 +1,43 @@
+"""Micro-benchmark: preprocess_input against the old regex chain.
+
+Run from the repository root:  python benchmarks/preprocess_bench.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from college_chatbot import CollegeChatbot
+
+def legacy_preprocess(user_input):
+    """The original lower/strip + two re.sub implementation"""
+    processed = user_input.lower().strip()
+    processed = re.sub(r'[^\w\s]', ' ', processed)
+    processed = re.sub(r'\s+', ' ', processed)
+    return processed
+
+SAMPLES = {
+    'button': 'fees',
+    'short': 'What are the admission requirements?',
+    'unicode': 'Café fees — ₹80,000?  Naïve   question…',
+    '10KB': ('How much are the hostel fees, and is Wi-Fi included?! ' * 190)[:10240],
+}
+
+def bench(func, text, number):
+    """Best-of-5 time per call in microseconds"""
+    return min(timeit.repeat(lambda: func(text), number=number, repeat=5)) / number * 1e6
+
+def main():
+    chatbot = CollegeChatbot()
+    print(f"{'input':<10}{'chars':>8}{'legacy us':>12}{'current us':>12}{'speedup':>10}")
+    for name, text in SAMPLES.items():
+        assert chatbot.preprocess_input(text) == legacy_preprocess(text)
+        number = 200 if len(text) > 1000 else 20000
+        legacy = bench(legacy_preprocess, text, number)
+        current = bench(chatbot.preprocess_input, text, number)
+        print(f"{name:<10}{len(text):>8}{legacy:>12.2f}{current:>12.2f}{legacy / current:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
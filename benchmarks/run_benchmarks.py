@@ -0,0 +1,173 @@
+"""Benchmark suite: matching micro-benchmarks plus end-to-end /chat load.
+
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --port 5000     # against a running server
+
+Results are written as JSON so runs can be compared across releases.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from college_chatbot import CollegeChatbot
+from main import app
+from load_test import percentile, run as run_http
+
+# Realistic traffic: quick-question buttons, single-intent questions,
+# questions touching several intents, and questions nothing matches
+CORPUS = {
+    'button': ['courses', 'admission', 'fees', 'facilities'],
+    'single': [
+        'What are the admission requirements?',
+        'How much are the tuition fees per year?',
+        'Do you have a hostel for girls?',
+        'Where is the college located?',
+        'How can I contact the admissions office?',
+        'Tell me about the library',
+        'hello there!',
+        'thank you so much',
+    ],
+    'multi': [
+        'What are the fees and scholarship options for engineering?',
+        'I want to apply for MBA, what is the application process and eligibility?',
+        'Is there a library and hostel on campus, and what does it cost?',
+        'Hi, can you help me with admission to computer science courses?',
+    ],
+    'fallback': [
+        'What is the weather like today?',
+        'Who won the football match yesterday?',
+        'asdfghjkl',
+        'Can I bring my dog?',
+    ],
+}
+
+def time_calls(func, inputs, rounds):
+    """Per-call latencies in seconds, cycling through the inputs"""
+    timings = []
+    perf_counter = time.perf_counter
+    for _ in range(rounds):
+        for text in inputs:
+            start = perf_counter()
+            func(text)
+            timings.append(perf_counter() - start)
+    return timings
+
+def summarize(timings, elapsed=None):
+    """Latency percentiles in microseconds and calls per second"""
+    timings = sorted(timings)
+    total = elapsed if elapsed is not None else sum(timings)
+    return {
+        'calls': len(timings),
+        'per_second': len(timings) / total if total else 0.0,
+        'mean_us': total / len(timings) * 1e6 if timings else 0.0,
+        'p50_us': percentile(timings, 50) * 1e6,
+        'p95_us': percentile(timings, 95) * 1e6,
+        'p99_us': percentile(timings, 99) * 1e6,
+    }
+
+def micro_benchmarks(rounds):
+    """preprocess_input and get_response over each corpus category"""
+    chatbot = CollegeChatbot()
+    results = {}
+    for category, inputs in CORPUS.items():
+        processed = [chatbot.preprocess_input(text) for text in inputs]
+        results[category] = {
+            'preprocess_input': summarize(time_calls(chatbot.preprocess_input, inputs, rounds)),
+            'get_response': summarize(time_calls(chatbot.get_response, inputs, rounds)),
+            'match': summarize(time_calls(chatbot.match, processed, rounds)),
+        }
+    return results
+
+def test_client_load(requests_per_thread, threads):
+    """Drive /chat through Flask's test client from several threads"""
+    messages = [text for inputs in CORPUS.values() for text in inputs]
+    timings = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        local = []
+        failed = 0
+        for i in range(requests_per_thread):
+            start = time.perf_counter()
+            response = client.post('/chat', json={'message': messages[i % len(messages)]})
+            response.get_data()
+            local.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failed += 1
+        with lock:
+            timings.extend(local)
+            errors.append(failed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        'threads': threads,
+        'requests': len(timings),
+        'errors': sum(errors),
+        'rps': len(timings) / elapsed,
+        'p50_ms': percentile(timings, 50) * 1000,
+        'p95_ms': percentile(timings, 95) * 1000,
+        'p99_ms': percentile(timings, 99) * 1000,
+    }
+
+def environment():
+    """Where and on what revision the numbers were taken"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=2000, help='micro-benchmark passes over the corpus')
+    parser.add_argument('--requests', type=int, default=2000, help='test-client requests per thread')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--port', type=int, help='also load-test a server already running on this port')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--output', help='write JSON results here (default: stdout)')
+    args = parser.parse_args()
+
+    results = {
+        'environment': environment(),
+        'micro': micro_benchmarks(args.rounds),
+        'test_client': test_client_load(args.requests, args.threads),
+    }
+    if args.port:
+        results['http'] = run_http('127.0.0.1', args.port, args.threads * 8, args.duration)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + '\n')
+        print(f"📊 Results written to {args.output}")
+    else:
+        print(report)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Scaling curve: keyword matching latency at 100, 1k and 10k intents.
+
+Each size is a synthetic knowledge base from generate_knowledge_base.py.
+Every question is answered twice, by flat scoring (every intent listing
+a matched keyword is scored) and by category routing, and the answers
+are checked to agree.
+
+Run from the repository root:  python benchmarks/scaling_bench.py [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_knowledge_base import generate, sample_queries
+from college_chatbot import CollegeChatbot
+
+def per_query(func, queries, repeat=5):
+    """Best-of-repeat time per query in microseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            func(query)
+        best = min(best, time.perf_counter() - start)
+    return best / len(queries) * 1e6
+
+def measure(n_intents, n_queries=2000):
+    knowledge_base = generate(n_intents)
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(knowledge_base, f)
+    try:
+        start = time.perf_counter()
+        chatbot = CollegeChatbot(f.name, routing='category')
+        build = time.perf_counter() - start
+    finally:
+        os.unlink(f.name)
+
+    queries = [chatbot.preprocess_input(query) for query in sample_queries(knowledge_base, n_queries)]
+    matched = {query: chatbot.scan_keywords(query) for query in queries}
+    for query in queries:
+        assert chatbot.router.best_match(query, matched[query]) == \
+            chatbot.best_match(chatbot.score_intents(query, matched[query])), query
+
+    return {
+        'intents': n_intents,
+        'categories': len(chatbot.router.categories),
+        'build_s': round(build, 3),
+        'scan_us': round(per_query(chatbot.scan_keywords, queries), 1),
+        'flat_us': round(per_query(lambda query: chatbot.best_match(chatbot.score_intents(query, matched[query])),
+                                   queries), 1),
+        'routed_us': round(per_query(lambda query: chatbot.router.best_match(query, matched[query]), queries), 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = [measure(int(size)) for size in args.sizes.split(',')]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'intents':>8}{'categories':>12}{'build s':>9}{'scan us':>9}{'flat us':>9}{'routed us':>11}")
+    for result in results:
+        print(f"{result['intents']:>8}{result['categories']:>12}{result['build_s']:>9.2f}"
+              f"{result['scan_us']:>9.1f}{result['flat_us']:>9.1f}{result['routed_us']:>11.1f}")
+
+if __name__ == '__main__':
+    main()
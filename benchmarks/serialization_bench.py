@@ -0,0 +1,52 @@
+"""Micro-benchmark: cost of building the /chat reply body, before and after.
+
+Before: jsonify() with Flask's default (stdlib) JSON provider encodes the
+reply on every request. After: the reply for a matched intent is a
+payload encoded when the knowledge base loaded, and dynamic replies go
+through the fastest installed JSON backend.
+
+Run from the repository root:  python benchmarks/serialization_bench.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, Response, jsonify
+
+import fastjson
+from college_chatbot import CollegeChatbot
+from main import app
+
+def bench(func, number=20000):
+    """Best-of-5 time per call in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+def main():
+    chatbot = CollegeChatbot()
+    legacy_app = Flask('legacy')
+    text = chatbot.responses['fees']['response']
+    payload = chatbot.intent_payloads['fees']
+    reply = {'response': text, 'status': 'success'}
+    detail = dict(reply, intent='fees', score=10, fallback=False, match='keyword',
+                  candidates=[{'intent': 'fees', 'score': 10, 'keywords': ['fees']}])
+
+    with legacy_app.app_context():
+        before = bench(lambda: jsonify(reply))
+        before_detail = bench(lambda: jsonify(detail))
+    with app.app_context():
+        after = bench(lambda: Response(payload, mimetype='application/json'))
+        after_detail = bench(lambda: jsonify(detail))
+
+    print(f"JSON backend: {fastjson.BACKEND}")
+    print(f"{'reply':<22}{'before us':>11}{'after us':>11}{'speedup':>10}")
+    print(f"{'intent answer':<22}{before:>11.2f}{after:>11.2f}{before / after:>9.1f}x")
+    print(f"{'debug (dynamic)':<22}{before_detail:>11.2f}{after_detail:>11.2f}{before_detail / after_detail:>9.1f}x")
+
+    client = app.test_client()
+    end_to_end = bench(lambda: client.post('/chat', json={'message': 'fees'}), number=2000)
+    print(f"\n/chat end to end through the test client: {end_to_end:.1f} us per request")
+
+if __name__ == '__main__':
+    main()
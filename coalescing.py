@@ -0,0 +1,61 @@
+"""Single-flight request coalescing.
+
+When many threads ask for the same key at once, only the first (the
+leader) runs the computation. The others wait for its result instead of
+repeating the work. Nothing is kept once the call finishes, so this is
+not a cache: a question asked after the answer was delivered is
+computed again.
+"""
+import threading
+
+class Call:
+    """One in-flight computation and the outcome its waiters will share"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Run func once per key among concurrent callers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> Call currently being computed
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, func):
+        """func() for the key, shared with any caller already computing it"""
+        with self.lock:
+            call = self.calls.get(key)
+            if call is None:
+                call = self.calls[key] = Call()
+                self.leaders += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            # Waiters see the same failure; the next caller tries afresh
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self.lock:
+            return {'in_flight': len(self.calls), 'leaders': self.leaders, 'coalesced': self.coalesced}
@@ -0,0 +1,463 @@
+"""The chatbot itself: knowledge base compilation and matching.
+
+Nothing here touches the web app, so tools that only need to answer
+messages (analytics workers, snapshot builds, benchmarks) import this
+module without starting a reload watcher, session store or interaction
+log.
+"""
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from knowledge_base import load_knowledge_base
+from ranking import BM25Ranker, STOPWORDS
+from fuzzy import SymSpellIndex
+from semantic import SemanticIndex
+from routing import CategoryRouter
+from coalescing import SingleFlight
+from snapshot import snapshot_path, snapshot_key, read_snapshot, save_snapshot
+import fastjson
+
+DEFAULT_KNOWLEDGE_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knowledge_base.json')
+
+def keyword_trie_pattern(keywords):
+    """Build a regex alternation shaped like a trie of the keywords.
+
+    Shared prefixes are matched once, so scanning costs the same per
+    character however many keywords there are. At each position the
+    pattern matches the longest keyword starting there.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if len(branches) == 1 and '' not in node:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if '' in node else group
+
+    return emit(trie)
+
+class ResponseCache:
+    """Bounded LRU cache with optional TTL, safe to share between threads"""
+
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value or None, refreshing its LRU position"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entries"""
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Counters for the health endpoint"""
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+class CollegeChatbot:
+    NON_WORD_RUN = re.compile(r'\W+')
+    # Matches found only after spelling correction score lower than exact ones
+    CORRECTED_WEIGHT = 0.6
+    # Words that point back at the previous topic, and the low score such
+    # context-only answers carry
+    FOLLOW_UP_WORDS = frozenset(['it', 'its', 'that', 'this', 'those', 'these', 'them', 'there', 'more'])
+    CONTEXT_SCORE = 1
+    # Below this many intents flat keyword scoring is faster than routing
+    ROUTING_THRESHOLD = 500
+
+    # Everything compiled from the knowledge base, as stored in a snapshot
+    COMPILED_STATE = ('responses', 'fallback_responses', 'intent_keys', 'keyword_postings', 'keyword_prefixes',
+                      'keyword_pattern', 'router', 'spelling', 'intent_payloads', 'fallback_payloads',
+                      'ranker', 'semantic')
+
+    def __init__(self, knowledge_base=DEFAULT_KNOWLEDGE_BASE, cache_size=0, cache_ttl=None,
+                 ranking='keyword', semantic=False, semantic_budget=0.005, routing='auto', coalesce=False,
+                 snapshot_secret=None):
+        # Intents and fallbacks live in the knowledge base file
+        self.knowledge_base = knowledge_base
+        if routing not in ('auto', 'category', 'flat'):
+            raise ValueError('Unknown routing: %s' % routing)
+        if ranking not in ('keyword', 'bm25'):
+            raise ValueError('Unknown ranking: %s' % ranking)
+        self.routing = routing
+        self.ranker_name = ranking
+
+        # With a snapshot secret the compiled state is loaded from (or saved
+        # to) a signed snapshot next to the knowledge base, keyed on its content
+        start = time.perf_counter()
+        state = None
+        if snapshot_secret:
+            secret = snapshot_secret.encode('utf-8')
+            path = snapshot_path(knowledge_base)
+            key = snapshot_key(knowledge_base,
+                               {'ranking': ranking, 'semantic': semantic, 'routing': routing,
+                                'json': fastjson.BACKEND},
+                               (type(self), CategoryRouter, SymSpellIndex, BM25Ranker, SemanticIndex))
+            state = read_snapshot(path, key, secret)
+        self.from_snapshot = state is not None
+        if state is not None:
+            for name in self.COMPILED_STATE:
+                setattr(self, name, state[name])
+        else:
+            self.compile(ranking, semantic)
+            if snapshot_secret:
+                save_snapshot(path, key, {name: getattr(self, name) for name in self.COMPILED_STATE}, secret)
+        self.build_seconds = time.perf_counter() - start
+
+        # Semantic matching only runs while its recent per-query cost fits
+        # in semantic_budget seconds
+        self.semantic_budget = semantic_budget
+        self.semantic_cost = 0.0
+        self.semantic_matched = 0
+        self.semantic_skipped = 0
+
+        # Opt-in cache of match results keyed on preprocessed input. It holds
+        # the matched intent rather than the reply text, so fallbacks are
+        # still drawn at random on every request.
+        self.cache = ResponseCache(cache_size, cache_ttl) if cache_size > 0 else None
+
+        # Concurrent requests for the same preprocessed input share one match
+        self.single_flight = SingleFlight() if coalesce else None
+
+    def compile(self, ranking, semantic):
+        """Load the knowledge base and build every index from it"""
+        self.responses, self.fallback_responses = load_knowledge_base(self.knowledge_base)
+        self.build_index()
+        self.build_payloads()
+
+        # Optional BM25 ranking replaces keyword scoring for matching
+        self.ranker = BM25Ranker(self.responses, self.preprocess_input) if ranking == 'bm25' else None
+
+        # Optional semantic matching for input the keywords miss
+        self.semantic = SemanticIndex(self.responses, self.preprocess_input) if semantic else None
+
+    def build_index(self):
+        """Compile the keyword index used to score all intents in one pass"""
+        self.intent_keys = list(self.responses)
+
+        # keyword -> ranks of the intents listing it (once per listing)
+        self.keyword_postings = {}
+        for rank, key in enumerate(self.intent_keys):
+            for keyword in self.responses[key]['keywords']:
+                self.keyword_postings.setdefault(keyword, []).append(rank)
+
+        # The scan reports the longest keyword starting at each position;
+        # every keyword that is a prefix of it matches there too
+        keywords = list(self.keyword_postings)
+        self.keyword_prefixes = {
+            keyword: [keyword[:end] for end in range(1, len(keyword) + 1) if keyword[:end] in self.keyword_postings]
+            for keyword in keywords
+        }
+        self.keyword_pattern = re.compile('(?=(' + keyword_trie_pattern(keywords) + '))')
+
+        # Large knowledge bases score categories first, then only the intents
+        # of categories that can still win
+        self.router = None
+        if self.routing == 'category' or (self.routing == 'auto' and len(self.intent_keys) >= self.ROUTING_THRESHOLD):
+            self.router = CategoryRouter(self.intent_keys, self.responses, self.keyword_postings)
+            # One category is just flat scoring with extra steps
+            if self.routing == 'auto' and len(self.router.categories) < 2:
+                self.router = None
+
+        # Misspelt words are corrected against the keyword vocabulary
+        self.spelling = SymSpellIndex((token for keyword in keywords for token in keyword.split()),
+                                      ignore=STOPWORDS)
+
+    def build_payloads(self):
+        """Encode the /chat reply for every intent and fallback once"""
+        self.intent_payloads = {key: fastjson.dumps({'response': intent['response'], 'status': 'success'})
+                                for key, intent in self.responses.items()}
+        self.fallback_payloads = [fastjson.dumps({'response': response, 'status': 'success'})
+                                  for response in self.fallback_responses]
+
+    def scan_keywords(self, processed_input):
+        """Every keyword occurring in preprocessed input, in one scan"""
+        matched = set()
+        for match in self.keyword_pattern.finditer(processed_input):
+            keyword = match.group(1)
+            if keyword not in matched:
+                matched.update(self.keyword_prefixes.get(keyword, ()))
+        return matched
+
+    def score_intents(self, processed_input, matched=None):
+        """Score every intent against preprocessed input"""
+        if matched is None:
+            matched = self.scan_keywords(processed_input)
+
+        scores = {}
+        for keyword in matched:
+            # Give higher score for exact matches
+            points = 10 if keyword == processed_input else 5
+            for rank in self.keyword_postings[keyword]:
+                scores[rank] = scores.get(rank, 0) + points
+        return scores
+
+    def best_match(self, scores):
+        """Pick the highest scoring intent, earliest intent wins ties"""
+        best_match = None
+        highest_score = 0
+        for rank in sorted(scores):
+            if scores[rank] > highest_score:
+                highest_score = scores[rank]
+                best_match = self.intent_keys[rank]
+        return best_match, highest_score
+
+    def preprocess_input(self, user_input):
+        """Clean and preprocess user input"""
+        # Convert to lowercase and remove extra whitespace
+        processed = user_input.lower().strip()
+        # Plain words need no further cleaning
+        if processed.isalnum():
+            return processed
+        # Punctuation and whitespace both become a single space, so any run
+        # of non-word characters collapses to one space in a single pass
+        return self.NON_WORD_RUN.sub(' ', processed)
+    
+    def get_response(self, user_input):
+        """Generate response based on user input"""
+        processed_input = self.preprocess_input(user_input)
+        
+        # Calculate confidence scores for each response
+        best_match, highest_score = self.match(processed_input)
+        
+        return self.select_response(best_match, highest_score)
+
+    def get_responses(self, messages):
+        """Generate responses for a batch of user inputs, in order"""
+        # Repeated questions are preprocessed and scored once per batch
+        processed = {}
+        for user_input in messages:
+            if user_input not in processed:
+                processed[user_input] = self.preprocess_input(user_input)
+        matches = self.match_many(set(processed.values()))
+        return [self.select_response(*matches[processed[user_input]]) for user_input in messages]
+
+    def match(self, processed_input):
+        """Find the best intent for preprocessed input, using the cache if enabled"""
+        if self.single_flight is not None:
+            return self.single_flight.do(processed_input,
+                                         lambda: self.match_many([processed_input])[processed_input])
+        return self.match_many([processed_input])[processed_input]
+
+    def match_many(self, processed_inputs):
+        """Best (intent, score) for each distinct preprocessed input"""
+        matches = {}
+        pending = []
+        for processed_input in processed_inputs:
+            cached = self.cache.get(processed_input) if self.cache is not None else None
+            if cached is not None:
+                matches[processed_input] = cached
+            else:
+                pending.append(processed_input)
+        
+        results = self.score_pending(pending)
+        
+        # Retry unmatched input with typos corrected, at reduced confidence
+        corrections = {}
+        for processed_input, (best_match, _) in zip(pending, results):
+            if best_match is None:
+                corrected = self.spelling.correct_text(processed_input)
+                if corrected != processed_input:
+                    corrections[processed_input] = corrected
+        if corrections:
+            corrected_results = dict(zip(corrections, self.score_pending(list(corrections.values()))))
+            for i, processed_input in enumerate(pending):
+                best_match, score = corrected_results.get(processed_input, (None, 0))
+                if best_match is not None:
+                    results[i] = (best_match, score * self.CORRECTED_WEIGHT)
+        
+        # Whatever is still unmatched goes to the semantic matcher
+        if self.semantic is not None:
+            unmatched = [processed_input for processed_input, (best_match, _) in zip(pending, results)
+                         if best_match is None]
+            if unmatched:
+                semantic_results = self.semantic_matches(unmatched)
+                for i, processed_input in enumerate(pending):
+                    if processed_input in semantic_results:
+                        results[i] = semantic_results[processed_input]
+        
+        for processed_input, result in zip(pending, results):
+            matches[processed_input] = result
+            if self.cache is not None:
+                self.cache.put(processed_input, result)
+        return matches
+
+    def score_pending(self, processed_inputs):
+        """Run the matching engine over inputs the cache could not answer"""
+        if self.ranker is not None:
+            # One vectorized pass scores the whole batch
+            return self.ranker.best_matches(processed_inputs)
+        if self.router is not None:
+            return [self.router.best_match(processed_input, self.scan_keywords(processed_input))
+                    for processed_input in processed_inputs]
+        return [self.best_match(self.score_intents(processed_input))
+                for processed_input in processed_inputs]
+
+    def semantic_matches(self, processed_inputs):
+        """Semantic (intent, similarity) for as many inputs as the latency budget allows"""
+        cost = self.semantic_cost
+        allowed = len(processed_inputs) if cost == 0 else int(self.semantic_budget / cost)
+        if allowed < len(processed_inputs):
+            self.semantic_skipped += len(processed_inputs) - allowed
+            # Skipping shrinks the estimate, so the matcher is tried again later
+            self.semantic_cost = cost * 0.9
+            processed_inputs = processed_inputs[:allowed]
+        if not processed_inputs:
+            return {}
+        start = time.perf_counter()
+        results = self.semantic.best_matches(processed_inputs)
+        per_query = (time.perf_counter() - start) / len(processed_inputs)
+        self.semantic_cost = per_query if cost == 0 else 0.8 * cost + 0.2 * per_query
+        matches = {processed_input: result for processed_input, result in zip(processed_inputs, results)
+                   if result[0] is not None}
+        self.semantic_matched += len(matches)
+        return matches
+
+    def resolve_follow_up(self, processed_input, last_intent):
+        """Answer an unmatched follow-up ("what about its duration?") from context"""
+        if last_intent in self.responses and not self.FOLLOW_UP_WORDS.isdisjoint(processed_input.split()):
+            return last_intent, self.CONTEXT_SCORE
+        return None, 0
+
+    def get_result(self, user_input, k=3, last_intent=None):
+        """Reply plus how it was chosen: top-k candidates, matched keywords, fallback"""
+        processed_input = self.preprocess_input(user_input)
+        best_match, highest_score, source, candidates = self.match_detail(processed_input, k)
+        if best_match is None and last_intent is not None:
+            best_match, highest_score = self.resolve_follow_up(processed_input, last_intent)
+            if best_match is not None:
+                source = 'context'
+        return {
+            'response': self.select_response(best_match, highest_score),
+            'intent': best_match,
+            'score': highest_score,
+            'fallback': best_match is None,
+            'match': source,
+            'candidates': candidates
+        }
+
+    def match_detail(self, processed_input, k=3):
+        """(intent, score, stage, candidates) from the first matching stage, uncached"""
+        candidates = self.candidates(processed_input, k)
+        if candidates and self.accepts(candidates[0]['score']):
+            return candidates[0]['intent'], candidates[0]['score'], self.ranker_name, candidates
+        corrected = self.spelling.correct_text(processed_input)
+        if corrected != processed_input:
+            corrected_candidates = self.candidates(corrected, k, self.CORRECTED_WEIGHT)
+            if corrected_candidates and self.accepts(corrected_candidates[0]['score'] / self.CORRECTED_WEIGHT):
+                best = corrected_candidates[0]
+                return best['intent'], best['score'], 'corrected', corrected_candidates
+        if self.semantic is not None and self.semantic_matches([processed_input]):
+            semantic_candidates = [{'intent': intent, 'score': similarity, 'keywords': []}
+                                   for intent, similarity in self.semantic.top_k(processed_input, k)]
+            best = semantic_candidates[0]
+            return best['intent'], best['score'], 'semantic', semantic_candidates
+        return None, 0, None, candidates
+
+    def candidates(self, processed_input, k=3, weight=1):
+        """Top-k intents with their scores and the keywords they matched"""
+        matched = self.scan_keywords(processed_input)
+        if self.ranker is not None:
+            ranked = self.ranker.top_k(processed_input, k)
+        else:
+            scores = self.score_intents(processed_input, matched)
+            ranked = [(self.intent_keys[rank], scores[rank])
+                      for rank in sorted(scores, key=lambda rank: (-scores[rank], rank))[:k]]
+        return [{'intent': intent, 'score': score * weight,
+                 'keywords': [keyword for keyword in self.responses[intent]['keywords'] if keyword in matched]}
+                for intent, score in ranked]
+
+    def accepts(self, score):
+        """Whether a top candidate's score is enough for an answer"""
+        return score >= self.ranker.min_score if self.ranker is not None else score > 0
+
+    def rank(self, user_input, k=3):
+        """Top-k (intent, score) pairs for a message"""
+        processed_input = self.preprocess_input(user_input)
+        if self.ranker is not None:
+            return self.ranker.top_k(processed_input, k)
+        scores = self.score_intents(processed_input)
+        ranked = sorted(scores, key=lambda rank: (-scores[rank], rank))[:k]
+        return [(self.intent_keys[rank], scores[rank]) for rank in ranked]
+
+    def select_reply(self, best_match, highest_score):
+        """(reply text, its precomputed /chat payload) for the best match"""
+        if best_match:
+            return self.responses[best_match]['response'], self.intent_payloads[best_match]
+        # randrange draws the same numbers random.choice would
+        i = random.randrange(len(self.fallback_responses))
+        return self.fallback_responses[i], self.fallback_payloads[i]
+
+    def select_response(self, best_match, highest_score):
+        """Turn the best match into the reply text"""
+        # Return best match if confidence is high enough
+        if best_match:
+            return self.responses[best_match]['response']
+        
+        # Return random fallback response
+        return random.choice(self.fallback_responses)
+
+KNOWLEDGE_BASE = os.environ.get('CHATBOT_KNOWLEDGE_BASE', DEFAULT_KNOWLEDGE_BASE)
+
+def create_chatbot(knowledge_base=KNOWLEDGE_BASE):
+    """Build a chatbot from the configured knowledge base"""
+    # CHATBOT_CACHE_SIZE > 0 enables the response cache
+    return CollegeChatbot(
+        knowledge_base=knowledge_base,
+        cache_size=int(os.environ.get('CHATBOT_CACHE_SIZE', 0)),
+        cache_ttl=float(os.environ.get('CHATBOT_CACHE_TTL', 0)) or None,
+        ranking=os.environ.get('CHATBOT_RANKING', 'keyword'),
+        semantic=os.environ.get('CHATBOT_SEMANTIC') == '1',
+        semantic_budget=float(os.environ.get('CHATBOT_SEMANTIC_BUDGET_MS', 5)) / 1000,
+        routing=os.environ.get('CHATBOT_ROUTING', 'auto'),
+        coalesce=os.environ.get('CHATBOT_COALESCE', '1') != '0',
+        # Snapshots are off unless a deploy secret to sign them is set
+        snapshot_secret=os.environ.get('CHATBOT_SNAPSHOT_SECRET')
+    )
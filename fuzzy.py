@@ -0,0 +1,139 @@
+"""Typo-tolerant lookup over the keyword vocabulary (SymSpell deletes).
+
+Every vocabulary word is indexed under each string reachable from it by
+deleting up to `max_distance` characters. A misspelt token is looked up
+the same way, so candidates come from a handful of dict probes no matter
+how large the vocabulary grows. Candidates are then confirmed with an
+exact edit distance.
+"""
+
+# Everyday words of four letters or more. They are one typo away from
+# many keywords ('feel' -> 'fees', 'please' -> 'place') but are almost
+# always meant as written, so they are never corrected.
+COMMON_WORDS = frozenset('''
+able about above after again against ago almost alone along already also
+although always among another answer anyone anything anyway around asked away
+back because become been before began behind being believe below best better
+between both bring brought call called came cannot care case come coming
+could course dear didn does doing done down during each early else enough
+even ever every exactly example face fact feel feeling felt find fine first
+five four free friend friends from full gave give given going gone good great
+guess half hand happy hard have having hear heard hello help here high hold
+home hope however idea into just keep kind knew know known last late later
+least leave left less life like likely little live long look looking lost
+made make many maybe mean means might mind mine more most much must myself
+name near need never next nice night none nothing okay once only open other
+over part people perhaps place please point pretty quite rather read ready
+real really right said same saying says seem seems seen shall should show
+since some someone something sometimes soon sorry still such sure take taken
+talk tell than thank thanks that their them then there these they thing
+things think this those though thought three through time today together told
+took true trying turn under until upon very want wanted wants well went were
+what whatever when where whether which while whole whom whose will wish with
+within without wonder word work would write wrong year years your yours
+'''.split())
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+def deletes(word, max_distance):
+    """All strings reachable by deleting up to max_distance characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {candidate[:i] + candidate[i + 1:]
+                    for candidate in frontier for i in range(len(candidate))}
+        results |= frontier
+    return results
+
+class SymSpellIndex:
+    """Corrects misspelt tokens to the closest vocabulary word"""
+    # Deletes grow with the square of a token's length, so messages past
+    # these sizes are only corrected in part
+    MAX_TOKENS = 32
+    MAX_CHARS = 512
+
+    def __init__(self, words, max_distance=2, min_length=4, ignore=()):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        # Common words ('from' -> 'form') are never treated as typos
+        self.ignore = COMMON_WORDS | frozenset(ignore)
+        self.vocabulary = {}
+        for word in words:
+            self.vocabulary[word] = self.vocabulary.get(word, 0) + 1
+        # A token this much longer than every word cannot be within reach of one
+        self.max_length = max(map(len, self.vocabulary), default=0) + max_distance
+        self.index = {}
+        for word in self.vocabulary:
+            if len(word) < min_length:
+                continue
+            for variant in deletes(word, self.distance_for(word)):
+                self.index.setdefault(variant, []).append(word)
+
+    def distance_for(self, word):
+        # Short words tolerate one typo, longer ones two
+        return 1 if len(word) <= 5 else self.max_distance
+
+    def correct(self, token):
+        """(word, distance) for the best correction, or None"""
+        if (token in self.vocabulary or token in self.ignore
+                or not self.min_length <= len(token) <= self.max_length):
+            return None
+        limit = self.distance_for(token)
+        candidates = set()
+        for variant in deletes(token, limit):
+            candidates.update(self.index.get(variant, ()))
+        best = None
+        for word in candidates:
+            distance = edit_distance(token, word, limit)
+            if distance > limit:
+                continue
+            # Closest first, then the word more intents use
+            key = (distance, -self.vocabulary[word], word)
+            if best is None or key < best[0]:
+                best = (key, word, distance)
+        return (best[1], best[2]) if best else None
+
+    def correct_text(self, processed_input):
+        """Preprocessed input with every correctable token replaced.
+
+        A lone corrected short word is too weak to answer on ('john' ->
+        'join'), so the input is then returned unchanged.
+        """
+        # Cut at a word boundary so no word is half corrected
+        end = len(processed_input)
+        if end > self.MAX_CHARS:
+            end = max(processed_input.rfind(' ', 0, self.MAX_CHARS + 1), 0)
+        tokens = processed_input[:end].split(' ')
+        corrected = 0
+        confident = False
+        for i, token in enumerate(tokens[:self.MAX_TOKENS]):
+            correction = self.correct(token)
+            if correction is not None:
+                tokens[i] = correction[0]
+                corrected += 1
+                # Short words tolerate one typo, and so collide with other words
+                confident = confident or self.distance_for(token) > 1
+        if not (confident or corrected > 1):
+            return processed_input
+        # Text past the cut is kept as it was
+        return ' '.join(tokens) + processed_input[end:]
@@ -0,0 +1,154 @@
+"""Append-only log of chat interactions, written off the request path.
+
+Request threads only append a tuple to an in-memory buffer. A background
+thread wakes up every `flush_interval` seconds, encodes the buffered
+records as NDJSON and writes them in one batch. When the buffer is full,
+because the disk is slow or gone, new records are dropped and counted
+instead of making requests wait.
+
+Every process writes its own file: the path's '{pid}' is replaced by
+the process id, and one is added before the extension if the path has
+none. Processes sharing a file would rotate it from under each other.
+Files rotate once they pass `max_bytes`. Rotated files get a UTC
+timestamp in their name and are gzipped by the writer thread when
+`compress` is on:
+
+    logs/interactions-4242.ndjson                       current file
+    logs/interactions-4242.20261018T093000Z.ndjson.gz   rotated shards
+"""
+import atexit
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+
+class InteractionLog:
+    """Buffered NDJSON writer with size-based rotation"""
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, compress=True, buffer_size=10000,
+                 flush_interval=1.0):
+        if '{pid}' not in path:
+            base, ext = os.path.splitext(path)
+            path = base + '-{pid}' + ext
+        self.path_template = path
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.write_errors = 0
+        self.reset()
+        # Forked workers each get their own buffer, thread and file
+        os.register_at_fork(after_in_child=self.reset)
+        atexit.register(self.close)
+
+    def reset(self):
+        self.path = self.path_template.replace('{pid}', str(os.getpid()))
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.thread = None
+        self.file = None
+
+    def record(self, session, message, intent, score, response, latency, tenant=None):
+        """Queue one interaction; never blocks on I/O"""
+        entry = (time.time(), session, message, intent, score, response, latency, tenant)
+        with self.lock:
+            if len(self.buffer) >= self.buffer_size:
+                self.dropped += 1
+                return
+            self.buffer.append(entry)
+            if self.thread is None:
+                # Started on first use, so a process that forks after
+                # building the app starts its writer in each worker
+                self.thread = threading.Thread(target=self.run, name='interaction-log', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while not self.stopping:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write everything buffered so far in one batch"""
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+        if not batch:
+            return
+        lines = []
+        for ts, session, message, intent, score, response, latency, tenant in batch:
+            record = {
+                'ts': round(ts, 3), 'session': session, 'message': message, 'intent': intent,
+                'score': score, 'response': response, 'latency_ms': round(latency * 1000, 3)
+            }
+            if tenant is not None:
+                record['tenant'] = tenant
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        try:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                self.file = open(self.path, 'ab')
+            self.file.write(data)
+            self.file.flush()
+            self.written += len(batch)
+            if self.file.tell() >= self.max_bytes:
+                self.rotate()
+        except OSError:
+            # The batch is lost, but the next flush tries again
+            self.write_errors += 1
+            self.dropped += len(batch)
+            self.close_file()
+
+    def rotate(self):
+        """Move the current file aside and start a new one"""
+        self.close_file()
+        base, ext = os.path.splitext(self.path)
+        stamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+        rotated = '%s.%s%s' % (base, stamp, ext)
+        suffix = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + '.gz'):
+            rotated = '%s.%s-%d%s' % (base, stamp, suffix, ext)
+            suffix += 1
+        os.replace(self.path, rotated)
+        self.rotations += 1
+        if self.compress:
+            with open(rotated, 'rb') as source, gzip.open(rotated + '.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(rotated)
+
+    def close_file(self):
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
+
+    def close(self):
+        """Stop the writer and write out what is still buffered"""
+        thread = self.thread
+        if thread is not None:
+            self.stopping = True
+            self.wakeup.set()
+            thread.join(timeout=5)
+        self.flush()
+        self.close_file()
+
+    def stats(self):
+        with self.lock:
+            buffered = len(self.buffer)
+        return {'path': self.path, 'written': self.written, 'dropped': self.dropped,
+                'buffered': buffered, 'rotations': self.rotations, 'write_errors': self.write_errors}
+
+def create_interaction_log(path, max_mb=64, compress=True, buffer_size=10000):
+    """Build the interaction log, or None when no path is configured"""
+    if not path:
+        return None
+    return InteractionLog(path, int(max_mb * 1024 * 1024), compress, buffer_size)
@@ -0,0 +1,173 @@
+"""Knowledge base storage for the college chatbot.
+
+Intents are edited in a JSON (or YAML, if PyYAML is installed) source
+file and compiled to a SQLite file next to it. Later loads read the
+compiled file instead of parsing the source, as long as the source's
+hash still matches. If the compiled file cannot be written, as on a
+read-only image, the source is loaded directly.
+
+Compile by hand with:  python knowledge_base.py knowledge_base.json
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+# The process umask, read once: os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE intents (
+    rank INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    category TEXT,
+    response TEXT NOT NULL
+);
+CREATE TABLE keywords (
+    intent_rank INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    keyword TEXT NOT NULL,
+    PRIMARY KEY (intent_rank, position)
+);
+CREATE TABLE fallbacks (position INTEGER PRIMARY KEY, response TEXT NOT NULL);
+'''
+
+def compiled_path(source):
+    """Where the compiled form of a source file lives"""
+    return os.path.splitext(source)[0] + '.db'
+
+def read_source(source):
+    """Parse a JSON or YAML source into (responses, fallback_responses, content hash)"""
+    with open(source, 'rb') as f:
+        raw = f.read()
+    if source.endswith(('.yaml', '.yml')):
+        if yaml is None:
+            raise RuntimeError('PyYAML is required to read ' + source)
+        data = yaml.safe_load(raw)
+    else:
+        data = json.loads(raw)
+
+    responses = {}
+    for name, intent in data['intents'].items():
+        responses[name] = {
+            'keywords': list(intent['keywords']),
+            'response': intent['response'],
+            'category': intent.get('category')
+        }
+    return responses, list(data['fallback_responses']), hashlib.sha256(raw).hexdigest()
+
+def replace_file(tmp_path, target):
+    """Rename a finished temporary file over target, with a new file's usual mode"""
+    # mkstemp files are private to their owner; a file built as root in an
+    # image must stay readable by the unprivileged server user
+    os.chmod(tmp_path, 0o666 & ~UMASK)
+    os.replace(tmp_path, target)
+
+def compile_knowledge_base(source, target=None):
+    """Compile a source file to SQLite, replacing the target atomically"""
+    target = target or compiled_path(source)
+    responses, fallback_responses, source_hash = read_source(source)
+
+    # Build beside the target and rename over it, so readers only ever
+    # see a complete file
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(target)))
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        with conn:
+            conn.executescript(SCHEMA)
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('format_version', str(FORMAT_VERSION)),
+                ('source_hash', source_hash)
+            ])
+            for rank, (name, intent) in enumerate(responses.items()):
+                conn.execute('INSERT INTO intents VALUES (?, ?, ?, ?)',
+                             (rank, name, intent['category'], intent['response']))
+                conn.executemany('INSERT INTO keywords VALUES (?, ?, ?)',
+                                 [(rank, position, keyword)
+                                  for position, keyword in enumerate(intent['keywords'])])
+            conn.executemany('INSERT INTO fallbacks VALUES (?, ?)', list(enumerate(fallback_responses)))
+        conn.close()
+        replace_file(tmp_path, target)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return target
+
+def read_compiled(path):
+    """Read (responses, fallback_responses, meta) from a compiled file"""
+    conn = sqlite3.connect('file:' + path + '?mode=ro', uri=True)
+    try:
+        meta = dict(conn.execute('SELECT key, value FROM meta'))
+        responses = {}
+        names = {}
+        for rank, name, category, response in conn.execute(
+                'SELECT rank, name, category, response FROM intents ORDER BY rank'):
+            responses[name] = {'keywords': [], 'response': response, 'category': category}
+            names[rank] = name
+        for rank, keyword in conn.execute(
+                'SELECT intent_rank, keyword FROM keywords ORDER BY intent_rank, position'):
+            responses[names[rank]]['keywords'].append(keyword)
+        fallback_responses = [row[0] for row in conn.execute(
+            'SELECT response FROM fallbacks ORDER BY position')]
+    finally:
+        conn.close()
+    return responses, fallback_responses, meta
+
+def source_hash(source):
+    """Content hash used to tell whether the compiled file is stale"""
+    with open(source, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def load_knowledge_base(path):
+    """Load intents, compiling the source first if the compiled file is stale.
+
+    `path` may be a source file or an already compiled .db file.
+    Returns (responses, fallback_responses).
+    """
+    if path.endswith('.db'):
+        responses, fallback_responses, _ = read_compiled(path)
+        return responses, fallback_responses
+
+    target = compiled_path(path)
+    expected = source_hash(path)
+    if os.path.exists(target):
+        try:
+            responses, fallback_responses, meta = read_compiled(target)
+            if (meta.get('source_hash') == expected
+                    and meta.get('format_version') == str(FORMAT_VERSION)):
+                return responses, fallback_responses
+        except sqlite3.DatabaseError:
+            pass
+
+    try:
+        compile_knowledge_base(path, target)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning('Could not compile %s (%s), loading the source directly', path, e)
+        responses, fallback_responses, _ = read_source(path)
+        return responses, fallback_responses
+    responses, fallback_responses, _ = read_compiled(target)
+    return responses, fallback_responses
+
+def file_signature(path):
+    """Cheap change detector for hot reload"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+if __name__ == '__main__':
+    for source in sys.argv[1:] or ['knowledge_base.json']:
+        print(f"📦 Compiled {source} -> {compile_knowledge_base(source)}")
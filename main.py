@@ -1,608 +1,563 @@
-from flask import Flask, render_template, request, jsonify
-import re
-import random
-import json
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g
+from werkzeug.datastructures import MultiDict
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import re
+import secrets
+import threading
+import time
+
+from knowledge_base import file_signature
+from ui_bundle import build_bundle
+from metrics import Registry, StackSampler, gauge_lines, counter_lines
+from sessions import Session, create_session_store
+from admission import TokenBucketLimiter, ConcurrencyLimiter, retry_after
+from interaction_log import create_interaction_log
+from tenants import TenantRegistry
+# CollegeChatbot and its helpers used to live here; they stay importable from main
+from college_chatbot import (CollegeChatbot, ResponseCache, keyword_trie_pattern, DEFAULT_KNOWLEDGE_BASE,
+                             KNOWLEDGE_BASE, create_chatbot)
+import fastjson
 
 app = Flask(__name__)
+# jsonify and request.get_json use orjson/ujson when installed
+app.json = fastjson.FastJSONProvider(app)
+# Behind n reverse proxies (CHATBOT_TRUSTED_PROXIES=n) the client address
+# comes from the X-Forwarded-For entries those proxies appended
+TRUSTED_PROXIES = int(os.environ.get('CHATBOT_TRUSTED_PROXIES', 0))
+if TRUSTED_PROXIES > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
 
-class CollegeChatbot:
-    def __init__(self):
-        self.responses = {
-            # Admissions
-            'admission': {
-                'keywords': ['admission', 'admit', 'entry', 'join', 'enroll'],
-                'response': '''Our admission requirements include: 📋
-• High school diploma or equivalent
-• Minimum 60% in 12th grade
-• Entrance exam (if applicable)
-• Application form with required documents
-• Interview (for some programs)'''
-            },
-            'requirements': {
-                'keywords': ['requirements', 'criteria', 'eligibility', 'qualify'],
-                'response': '''Admission requirements vary by program:
-• Undergraduate: 60% in 12th grade
-• Graduate: Bachelor's degree with 55%
-• Entrance exams may be required
-• English proficiency for international students'''
-            },
-            'application': {
-                'keywords': ['application', 'apply', 'form', 'process'],
-                'response': '''Application process: 📝
-1. Fill online application form
-2. Submit required documents
-3. Pay application fee
-4. Appear for entrance exam (if required)
-5. Attend interview
-6. Wait for admission decision'''
-            },
-            
-            # Courses
-            'courses': {
-                'keywords': ['courses', 'programs', 'study', 'degree', 'subjects'],
-                'response': '''We offer various programs: 🎓
-• Engineering (CS, IT, Mechanical, Civil)
-• Business (MBA, BBA, Commerce)
-• Arts & Sciences (English, Math, Physics)
-• Medical (Nursing, Pharmacy)
-• Law (LLB, LLM)'''
-            },
-            'engineering': {
-                'keywords': ['engineering', 'engineer', 'technical', 'cs', 'computer'],
-                'response': '''Engineering programs available:
-• Computer Science & Engineering
-• Information Technology
-• Mechanical Engineering
-• Civil Engineering
-• Electrical Engineering
-Duration: 4 years'''
-            },
-            'business': {
-                'keywords': ['business', 'mba', 'bba', 'commerce', 'management'],
-                'response': '''Business programs:
-• MBA (2 years)
-• BBA (3 years)
-• B.Com (3 years)
-• M.Com (2 years)
-Specializations available in Marketing, Finance, HR'''
-            },
-            
-            # Fees
-            'fees': {
-                'keywords': ['fees', 'cost', 'price', 'money', 'tuition'],
-                'response': '''Fee structure (per year): 💰
-• Engineering: ₹80,000 - ₹1,20,000
-• Business: ₹60,000 - ₹1,00,000
-• Arts & Sciences: ₹40,000 - ₹60,000
-• Scholarships available for eligible students'''
-            },
-            'scholarship': {
-                'keywords': ['scholarship', 'financial aid', 'discount', 'waiver'],
-                'response': '''Scholarships available: 🏆
-• Merit-based: Up to 50% fee waiver
-• Need-based: Up to 30% fee waiver
-• Sports quota: Up to 25% fee waiver
-• Minority scholarships available'''
-            },
-            
-            # Facilities
-            'facilities': {
-                'keywords': ['facilities', 'infrastructure', 'campus', 'building'],
-                'response': '''Our facilities include: 🏫
-• Modern classrooms with smart boards
-• Well-equipped laboratories
-• Central library with 50,000+ books
-• Sports complex
-• Hostel accommodation
-• Cafeteria
-• Medical center'''
-            },
-            'library': {
-                'keywords': ['library', 'books', 'reading', 'study'],
-                'response': '''Library facilities: 📚
-• 50,000+ books
-• Digital library with e-books
-• Research journals and publications
-• Computer lab with internet
-• Reading rooms
-• Study cubicles'''
-            },
-            'hostel': {
-                'keywords': ['hostel', 'accommodation', 'room', 'stay'],
-                'response': '''Hostel facilities: 🏠
-• Separate hostels for boys and girls
-• 24/7 security
-• Wi-Fi connectivity
-• Mess facility
-• Common rooms
-• Laundry service
-• Medical facility'''
-            },
-            
-            # General Info
-            'location': {
-                'keywords': ['location', 'address', 'where', 'place'],
-                'response': '''College Location: 📍
-• Main Campus: College Street, City
-• Well-connected by public transport
-• Nearby metro station
-• Bus stop at campus gate
-• Parking facilities available'''
-            },
-            'contact': {
-                'keywords': ['contact', 'phone', 'email', 'reach'],
-                'response': '''Contact Information: 📞
-• Phone: +91-XXXXXXXXXX
-• Email: info@college.edu
-• Address: College Street, City
-• Website: www.college.edu
-• Office hours: 9 AM - 5 PM'''
-            },
-            
-            # Greetings
-            'hello': {
-                'keywords': ['hello', 'hi', 'hey', 'greetings'],
-                'response': 'Hello! 👋 Welcome to our college information system. How can I help you today?'
-            },
-            'help': {
-                'keywords': ['help', 'assist', 'support'],
-                'response': '''I can help you with information about:
-• Admissions & Requirements
-• Courses & Programs
-• Fees & Scholarships
-• Facilities & Services
-• Contact Information
-
-Just ask me anything!'''
-            },
-            'thanks': {
-                'keywords': ['thanks', 'thank you', 'appreciate'],
-                'response': "You're welcome! 😊 If you have any other questions about our college, feel free to ask anytime!"
-            }
-        }
-        
-        self.fallback_responses = [
-            "I'm not sure about that specific question. Could you please ask about admissions, courses, fees, or facilities?",
-            "That's an interesting question! I can help you with college programs, admission requirements, fees, and facilities.",
-            "I don't have specific information about that. Try asking about our courses, admission process, or college facilities!",
-            "I'm here to help with college-related questions. Ask me about admissions, courses, fees, or facilities!"
-        ]
-    
-    def preprocess_input(self, user_input):
-        """Clean and preprocess user input"""
-        # Convert to lowercase and remove extra whitespace
-        processed = user_input.lower().strip()
-        # Remove punctuation
-        processed = re.sub(r'[^\w\s]', ' ', processed)
-        # Remove extra spaces
-        processed = re.sub(r'\s+', ' ', processed)
-        return processed
-    
-    def get_response(self, user_input):
-        """Generate response based on user input"""
-        processed_input = self.preprocess_input(user_input)
-        
-        # Calculate confidence scores for each response
-        best_match = None
-        highest_score = 0
-        
-        for key, data in self.responses.items():
-            score = 0
-            for keyword in data['keywords']:
-                if keyword in processed_input:
-                    # Give higher score for exact matches
-                    if keyword == processed_input:
-                        score += 10
-                    else:
-                        score += 5
-            
-            if score > highest_score:
-                highest_score = score
-                best_match = key
-        
-        # Return best match if confidence is high enough
-        if best_match and highest_score >= 5:
-            return self.responses[best_match]['response']
-        
-        # Return random fallback response
-        return random.choice(self.fallback_responses)
+RELOAD_INTERVAL = float(os.environ.get('CHATBOT_RELOAD_INTERVAL', 2))
 
 # Initialize chatbot
-chatbot = CollegeChatbot()
+chatbot = create_chatbot()
+knowledge_base_signature = file_signature(KNOWLEDGE_BASE)
+reload_lock = threading.Lock()
+reload_watcher_pid = None
+
+def watch_knowledge_base():
+    """Swap in a rebuilt chatbot whenever the knowledge base file changes"""
+    global chatbot, knowledge_base_signature
+    while True:
+        time.sleep(RELOAD_INTERVAL)
+        try:
+            signature = file_signature(KNOWLEDGE_BASE)
+            if signature != knowledge_base_signature:
+                # A broken file is reported once, not on every check
+                knowledge_base_signature = signature
+                # Requests already running hold a reference to the old chatbot,
+                # so rebinding the global never disturbs them
+                chatbot = create_chatbot()
+                app.logger.info('Reloaded knowledge base from %s', KNOWLEDGE_BASE)
+        except Exception:
+            app.logger.exception('Knowledge base reload failed, keeping the current one')
+
+@app.before_request
+def start_reload_watcher():
+    """Start this process's reload watcher with its first request"""
+    # Started lazily rather than at import, so a pre-fork master never
+    # forks while the watcher thread is busy rebuilding
+    global reload_watcher_pid
+    if RELOAD_INTERVAL <= 0 or reload_watcher_pid == os.getpid():
+        return
+    with reload_lock:
+        if reload_watcher_pid != os.getpid():
+            reload_watcher_pid = os.getpid()
+            threading.Thread(target=watch_knowledge_base, name='knowledge-base-watcher', daemon=True).start()
+
+# Colleges served under /t/<college>/..., each from CHATBOT_TENANTS_DIR/<college>.json.
+# With CHATBOT_TENANT_HOST_SUFFIX=.chat.example.edu, mit.chat.example.edu serves "mit" too.
+# Relative to this file, like the default knowledge base, not the working directory
+TENANTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           os.environ.get('CHATBOT_TENANTS_DIR', 'tenants'))
+tenants = TenantRegistry(
+    TENANTS_DIR,
+    create_chatbot,
+    max_resident=int(os.environ.get('CHATBOT_TENANTS_MAX', 50)),
+    reload_interval=RELOAD_INTERVAL
+)
+TENANT_HOST_SUFFIX = os.environ.get('CHATBOT_TENANT_HOST_SUFFIX', '').lower()
+
+def request_host():
+    """Request host name, lowercased and without a port"""
+    host = request.host.lower()
+    # '[::1]' has colons but no port
+    if not host.endswith(']'):
+        host = host.rpartition(':')[0] or host
+    return host
+
+def request_tenant(tenant=None):
+    """Tenant named by the path prefix or, if configured, the host"""
+    if tenant is None and TENANT_HOST_SUFFIX:
+        host = request_host()
+        if host.endswith(TENANT_HOST_SUFFIX):
+            tenant = host[:-len(TENANT_HOST_SUFFIX)]
+    return tenant
+
+def tenant_chatbot(tenant):
+    """Chatbot for a tenant (None means the default one), or None if unknown"""
+    return chatbot if tenant is None else tenants.get(tenant)
+
+def unknown_tenant(tenant):
+    return jsonify({'error': 'Unknown college: %s' % tenant, 'status': 'error'}), 404
+
+# Per-user conversation state (CHATBOT_SESSION_BACKEND=memory|sqlite)
+SESSION_COOKIE = 'chat_session'
+SESSION_TURNS = int(os.environ.get('CHATBOT_SESSION_TURNS', 5))
+SESSION_TTL = int(os.environ.get('CHATBOT_SESSION_TTL', 1800))
+# Ids we mint are 22 of these; anything else a client sends is replaced
+SESSION_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+sessions = create_session_store(
+    backend=os.environ.get('CHATBOT_SESSION_BACKEND', 'memory'),
+    path=os.environ.get('CHATBOT_SESSION_PATH', 'sessions.db'),
+    max_sessions=int(os.environ.get('CHATBOT_SESSION_MAX', 10000)),
+    ttl=SESSION_TTL
+)
+
+def session_key(tenant, session_id):
+    """Store key of a session; one browser talking to two colleges keeps two conversations"""
+    return session_id if tenant is None else tenant + ':' + session_id
+
+def open_session(tenant, data):
+    """(session id, session) of a request, from the cookie or an explicit session_id.
+
+    (None, None) when neither is a valid id, so a new one is minted.
+    """
+    for session_id in (request.cookies.get(SESSION_COOKIE), data.get('session_id')):
+        if isinstance(session_id, str) and SESSION_ID.fullmatch(session_id):
+            return session_id, sessions.get(session_key(tenant, session_id))
+    return None, None
+
+def match_in_session(bot, processed_input, session, detail=False):
+    """(intent, score, stage, candidates), falling back to the conversation's last topic"""
+    source = candidates = None
+    if detail:
+        best_match, highest_score, source, candidates = bot.match_detail(processed_input)
+    else:
+        best_match, highest_score = bot.match(processed_input)
+    if best_match is None and session is not None:
+        best_match, highest_score = bot.resolve_follow_up(processed_input, session.last_intent)
+        if best_match is not None:
+            source = 'context'
+    return best_match, highest_score, source, candidates
+
+def record_turn(tenant, session_id, session, user_message, best_match):
+    """Add a turn to the conversation, starting one if needed; returns its session id"""
+    if session_id is None:
+        session_id = secrets.token_urlsafe(16)
+    if session is None:
+        session = Session()
+    session.add_turn(user_message, best_match, SESSION_TURNS)
+    sessions.put(session_key(tenant, session_id), session)
+    return session_id
+
+def set_session_cookie(response, session_id):
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=SESSION_TTL, httponly=True, samesite='Lax')
+    response.headers['X-Session-ID'] = session_id
+
+# Request metrics, exposed at /metrics
+metrics = Registry()
+chat_requests = metrics.counter('chatbot_requests_total', 'Chat requests by outcome', ('status',))
+intent_hits = metrics.counter('chatbot_intent_hits_total', 'Answered chat requests by matched intent', ('intent',))
+request_seconds = metrics.histogram('chatbot_request_seconds', 'Time to answer /chat and /chat/stream').labels()
+phase_seconds = metrics.histogram('chatbot_phase_seconds', 'Time per /chat phase', ('phase',))
+# Bound series keep the per-request cost to a few lock acquisitions
+preprocess_seconds = phase_seconds.labels('preprocess')
+match_seconds = phase_seconds.labels('match')
+serialize_seconds = phase_seconds.labels('serialize')
+chat_succeeded = chat_requests.labels('success')
+
+profiler = StackSampler()
+metrics.add_collector(profiler.render)
+if float(os.environ.get('CHATBOT_PROFILE_INTERVAL_MS', 0)) > 0:
+    profiler.start(float(os.environ['CHATBOT_PROFILE_INTERVAL_MS']) / 1000)
+
+def cache_metrics():
+    """Expose the response cache counters when the cache is enabled"""
+    if chatbot.cache is None:
+        return []
+    stats = chatbot.cache.stats()
+    lines = gauge_lines('chatbot_cache_entries', 'Entries in the response cache', stats['size'])
+    for counter in ('hits', 'misses', 'evictions', 'expirations'):
+        lines += counter_lines('chatbot_cache_%s_total' % counter, 'Response cache %s' % counter, stats[counter])
+    return lines
+
+metrics.add_collector(cache_metrics)
+
+def semantic_metrics():
+    """Expose semantic matcher counters when it is enabled"""
+    if chatbot.semantic is None:
+        return []
+    lines = gauge_lines('chatbot_semantic_cost_seconds', 'Recent semantic matching cost per query',
+                        chatbot.semantic_cost)
+    for counter, help_text in (('matched', 'Inputs answered by the semantic matcher'),
+                               ('skipped', 'Inputs not sent to the semantic matcher to stay in budget')):
+        lines += counter_lines('chatbot_semantic_%s_total' % counter, help_text,
+                               getattr(chatbot, 'semantic_' + counter))
+    return lines
+
+metrics.add_collector(semantic_metrics)
+
+def coalescing_metrics():
+    """Expose how many requests shared another request's match"""
+    if chatbot.single_flight is None:
+        return []
+    stats = chatbot.single_flight.stats()
+    lines = gauge_lines('chatbot_coalescing_in_flight', 'Distinct inputs being matched right now',
+                        stats['in_flight'])
+    for counter, help_text in (('leaders', 'Matches computed, each shared by any identical concurrent requests'),
+                               ('coalesced', 'Requests that waited for an identical in-flight match')):
+        lines += counter_lines('chatbot_coalescing_%s_total' % counter, help_text, stats[counter])
+    return lines
+
+metrics.add_collector(coalescing_metrics)
+
+# Interactions for analytics, written by a background thread
+# (CHATBOT_INTERACTION_LOG=logs/interactions.ndjson, one file per process)
+interaction_log = create_interaction_log(
+    os.environ.get('CHATBOT_INTERACTION_LOG'),
+    max_mb=float(os.environ.get('CHATBOT_INTERACTION_LOG_MAX_MB', 64)),
+    compress=os.environ.get('CHATBOT_INTERACTION_LOG_COMPRESS', '1') != '0',
+    buffer_size=int(os.environ.get('CHATBOT_INTERACTION_LOG_BUFFER', 10000))
+)
+
+def interaction_log_metrics():
+    """Expose interaction log throughput and drops"""
+    if interaction_log is None:
+        return []
+    stats = interaction_log.stats()
+    lines = gauge_lines('chatbot_interaction_log_buffered', 'Interactions waiting to be written',
+                        stats['buffered'])
+    for counter in ('written', 'dropped', 'rotations', 'write_errors'):
+        lines += counter_lines('chatbot_interaction_log_%s_total' % counter,
+                               'Interaction log %s' % counter.replace('_', ' '), stats[counter])
+    return lines
+
+metrics.add_collector(interaction_log_metrics)
+
+# Admission control for the chat endpoints; /health, /metrics and the UI
+# are never limited so probes keep working under overload
+LIMITED_ENDPOINTS = frozenset(['chat', 'chat_stream', 'chat_batch'])
+RATE_LIMIT = float(os.environ.get('CHATBOT_RATE_LIMIT', 0))
+MAX_CONCURRENT = int(os.environ.get('CHATBOT_MAX_CONCURRENT', 0))
+rate_limiter = (TokenBucketLimiter(RATE_LIMIT, float(os.environ.get('CHATBOT_RATE_BURST', 20)))
+                if RATE_LIMIT > 0 else None)
+concurrency_limiter = (ConcurrencyLimiter(MAX_CONCURRENT,
+                                          int(os.environ.get('CHATBOT_MAX_QUEUE', 128)),
+                                          float(os.environ.get('CHATBOT_QUEUE_TIMEOUT', 2)))
+                       if MAX_CONCURRENT > 0 else None)
+shed_requests = metrics.counter('chatbot_shed_total', 'Requests rejected by admission control', ('reason',))
+
+@app.before_request
+def admit_request():
+    """Reject chat requests over the client's rate or the server's capacity"""
+    if request.endpoint not in LIMITED_ENDPOINTS:
+        return
+    if rate_limiter is not None:
+        # Keyed on the client address: session cookies are free to rotate
+        allowed, wait = rate_limiter.allow(request.remote_addr)
+        if not allowed:
+            shed_requests.inc('rate_limited')
+            return (jsonify({'error': 'Too many requests', 'status': 'error'}), 429,
+                    {'Retry-After': retry_after(wait)})
+    if concurrency_limiter is not None:
+        reason = concurrency_limiter.acquire()
+        if reason is not None:
+            shed_requests.inc(reason)
+            return (jsonify({'error': 'Server busy', 'status': 'error'}), 503,
+                    {'Retry-After': retry_after(concurrency_limiter.queue_timeout)})
+        g.admitted = True
+
+@app.teardown_request
+def release_request(exc):
+    """Free the concurrency slot once the response (or stream) is done"""
+    if g.pop('admitted', False):
+        concurrency_limiter.release()
+
+# Chat UI, minified and compressed once at startup
+ui_page, ui_assets = build_bundle()
+
+def send_asset(asset, cache_control):
+    """Serve a bundled asset, honouring If-None-Match and Accept-Encoding"""
+    encoding, body = asset.negotiate(request.accept_encodings)
+    etag = asset.etag(encoding)
+    headers = {'ETag': '"%s"' % etag, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype=asset.mimetype, headers=headers)
 
 @app.route('/')
 def home():
     """Render the main chat interface"""
-    return '''
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>College Info Chatbot - Python</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-
-        body {
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-
-        .chat-container {
-            background: rgba(255, 255, 255, 0.95);
-            backdrop-filter: blur(10px);
-            border-radius: 20px;
-            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.1);
-            width: 100%;
-            max-width: 600px;
-            height: 700px;
-            display: flex;
-            flex-direction: column;
-            overflow: hidden;
-            margin: 20px;
-        }
-
-        .chat-header {
-            background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-            color: white;
-            padding: 20px;
-            text-align: center;
-            position: relative;
-        }
-
-        .chat-header h1 {
-            font-size: 1.5rem;
-            margin-bottom: 5px;
-        }
-
-        .chat-header p {
-            opacity: 0.9;
-            font-size: 0.9rem;
-        }
-
-        .status-indicator {
-            position: absolute;
-            right: 20px;
-            top: 50%;
-            transform: translateY(-50%);
-            display: flex;
-            align-items: center;
-            gap: 8px;
-        }
-
-        .status-dot {
-            width: 8px;
-            height: 8px;
-            background: #4ade80;
-            border-radius: 50%;
-            animation: pulse 2s infinite;
-        }
-
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.5; }
-        }
-
-        .chat-messages {
-            flex: 1;
-            padding: 20px;
-            overflow-y: auto;
-            scroll-behavior: smooth;
-        }
-
-        .message {
-            margin-bottom: 15px;
-            display: flex;
-            animation: fadeIn 0.3s ease-in;
-        }
-
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(10px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-
-        .message.bot {
-            justify-content: flex-start;
-        }
-
-        .message.user {
-            justify-content: flex-end;
-        }
-
-        .message-content {
-            max-width: 80%;
-            padding: 12px 16px;
-            border-radius: 18px;
-            font-size: 0.95rem;
-            line-height: 1.4;
-            white-space: pre-line;
-        }
-
-        .message.bot .message-content {
-            background: #f1f3f4;
-            color: #333;
-            border-bottom-left-radius: 4px;
-        }
-
-        .message.user .message-content {
-            background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-            color: white;
-            border-bottom-right-radius: 4px;
-        }
-
-        .chat-input-container {
-            padding: 20px;
-            background: #f8f9fa;
-            border-top: 1px solid #e9ecef;
-        }
-
-        .chat-input-form {
-            display: flex;
-            gap: 10px;
-        }
-
-        .chat-input {
-            flex: 1;
-            padding: 12px 16px;
-            border: 2px solid #e9ecef;
-            border-radius: 25px;
-            font-size: 1rem;
-            outline: none;
-            transition: all 0.3s ease;
-        }
-
-        .chat-input:focus {
-            border-color: #4facfe;
-            box-shadow: 0 0 0 3px rgba(79, 172, 254, 0.1);
-        }
-
-        .send-button {
-            background: linear-gradient(135deg, #4facfe 0%, #00f2fe 100%);
-            color: white;
-            border: none;
-            border-radius: 50%;
-            width: 48px;
-            height: 48px;
-            cursor: pointer;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            transition: all 0.3s ease;
-            font-size: 1.2rem;
-        }
-
-        .send-button:hover {
-            transform: scale(1.05);
-            box-shadow: 0 5px 15px rgba(79, 172, 254, 0.3);
-        }
-
-        .quick-questions {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 8px;
-            margin-top: 15px;
-        }
-
-        .quick-question-btn {
-            background: rgba(79, 172, 254, 0.1);
-            color: #4facfe;
-            border: 1px solid rgba(79, 172, 254, 0.3);
-            border-radius: 20px;
-            padding: 8px 12px;
-            font-size: 0.85rem;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
-
-        .quick-question-btn:hover {
-            background: rgba(79, 172, 254, 0.2);
-            transform: translateY(-1px);
-        }
-
-        .typing-indicator {
-            display: none;
-            align-items: center;
-            gap: 8px;
-            padding: 12px 16px;
-            background: #f1f3f4;
-            border-radius: 18px;
-            border-bottom-left-radius: 4px;
-            max-width: 80px;
-            margin-bottom: 15px;
-        }
-
-        .typing-dots {
-            display: flex;
-            gap: 4px;
-        }
-
-        .typing-dot {
-            width: 6px;
-            height: 6px;
-            background: #999;
-            border-radius: 50%;
-            animation: typing 1.4s infinite;
-        }
-
-        .typing-dot:nth-child(2) { animation-delay: 0.2s; }
-        .typing-dot:nth-child(3) { animation-delay: 0.4s; }
-
-        @keyframes typing {
-            0%, 60%, 100% { transform: scale(1); opacity: 0.5; }
-            30% { transform: scale(1.2); opacity: 1; }
-        }
-
-        @media (max-width: 640px) {
-            .chat-container {
-                height: 100vh;
-                border-radius: 0;
-                margin: 0;
-            }
-
-            .status-indicator {
-                display: none;
-            }
-        }
-    </style>
-</head>
-<body>
-    <div class="chat-container">
-        <div class="chat-header">
-            <h1>Ai ChatBoT GEC-V</h1>
-            <p>Ask me anything about college information!</p>
-            <div class="status-indicator">
-                <div class="status-dot"></div>
-                <span style="font-size: 0.8rem;">Online</span>
-            </div>
-        </div>
-
-        <div class="chat-messages" id="chatMessages">
-            <div class="message bot">
-                <div class="message-content">
-                    👋 Hello! I'm your College Information Assistant powered by Python. I can help you with questions about admissions, courses, fees, facilities, and more. What would you like to know?
-                    <div class="quick-questions">
-                        <button class="quick-question-btn" onclick="askQuestion('courses')">Courses</button>
-                        <button class="quick-question-btn" onclick="askQuestion('admission')">Admissions</button>
-                        <button class="quick-question-btn" onclick="askQuestion('fees')">Fees</button>
-                        <button class="quick-question-btn" onclick="askQuestion('facilities')">Facilities</button>
-                    </div>
-                </div>
-            </div>
-            <div class="typing-indicator" id="typingIndicator">
-                <div class="typing-dots">
-                    <div class="typing-dot"></div>
-                    <div class="typing-dot"></div>
-                    <div class="typing-dot"></div>
-                </div>
-            </div>
-        </div>
-
-        <div class="chat-input-container">
-            <form class="chat-input-form" id="chatForm">
-                <input type="text" class="chat-input" id="chatInput" placeholder="Type your question here..." autocomplete="off">
-                <button type="submit" class="send-button">➤</button>
-            </form>
-        </div>
-    </div>
-
-    <script>
-        const chatMessages = document.getElementById('chatMessages');
-        const chatInput = document.getElementById('chatInput');
-        const chatForm = document.getElementById('chatForm');
-        const typingIndicator = document.getElementById('typingIndicator');
-
-        chatForm.addEventListener('submit', async (e) => {
-            e.preventDefault();
-            
-            const userInput = chatInput.value.trim();
-            if (!userInput) return;
-            
-            // Add user message
-            addMessage(userInput, 'user');
-            chatInput.value = '';
-            
-            // Show typing indicator
-            showTypingIndicator();
-            
-            try {
-                // Send message to Python backend
-                const response = await fetch('/chat', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ message: userInput })
-                });
-                
-                const data = await response.json();
-                
-                // Hide typing indicator and show response
-                setTimeout(() => {
-                    hideTypingIndicator();
-                    addMessage(data.response, 'bot');
-                }, 1000);
-                
-            } catch (error) {
-                hideTypingIndicator();
-                addMessage('Sorry, I encountered an error. Please try again.', 'bot');
-            }
-        });
-
-        function addMessage(content, sender) {
-            const messageDiv = document.createElement('div');
-            messageDiv.className = `message ${sender}`;
-            
-            const contentDiv = document.createElement('div');
-            contentDiv.className = 'message-content';
-            contentDiv.textContent = content;
-            
-            messageDiv.appendChild(contentDiv);
-            chatMessages.insertBefore(messageDiv, typingIndicator);
-            scrollToBottom();
-        }
-
-        function showTypingIndicator() {
-            typingIndicator.style.display = 'flex';
-            scrollToBottom();
-        }
-
-        function hideTypingIndicator() {
-            typingIndicator.style.display = 'none';
-        }
-
-        function scrollToBottom() {
-            setTimeout(() => {
-                chatMessages.scrollTop = chatMessages.scrollHeight;
-            }, 100);
-        }
-
-        function askQuestion(question) {
-            chatInput.value = question;
-            chatForm.dispatchEvent(new Event('submit'));
-        }
-    </script>
-</body>
-</html>
-    '''
+    # Revalidate the page on every visit so new asset fingerprints show up
+    return send_asset(ui_page, 'no-cache')
+
+@app.route('/assets/<name>')
+def assets(name):
+    """Serve fingerprinted CSS/JS for the chat interface"""
+    asset = ui_assets.get(name)
+    if asset is None:
+        return jsonify({'error': 'Not found'}), 404
+    return send_asset(asset, 'public, max-age=31536000, immutable')
 
 @app.route('/chat', methods=['POST'])
-def chat():
+@app.route('/t/<tenant>/chat', methods=['POST'])
+def chat(tenant=None):
     """Handle chat messages and return bot responses"""
+    start = time.perf_counter()
     try:
+        tenant = request_tenant(tenant)
+        bot = tenant_chatbot(tenant)
+        if bot is None:
+            chat_requests.inc('invalid')
+            return unknown_tenant(tenant)
+        
         data = request.get_json()
         user_message = data.get('message', '')
         
         if not user_message:
+            chat_requests.inc('invalid')
             return jsonify({'error': 'No message provided'}), 400
         
-        # Get response from chatbot
-        bot_response = chatbot.get_response(user_message)
+        # ?debug=1 or "detail": true explains the answer; it costs nothing otherwise
+        detail = request.args.get('debug') == '1' or bool(data.get('detail'))
+        
+        # Conversation so far
+        session_id, session = open_session(tenant, data)
+        
+        # Get response from chatbot, timing each phase
+        processed_input = bot.preprocess_input(user_message)
+        preprocessed = time.perf_counter()
+        best_match, highest_score, source, candidates = match_in_session(bot, processed_input, session, detail)
+        matched = time.perf_counter()
+        bot_response, payload = bot.select_reply(best_match, highest_score)
+        
+        if detail:
+            response = jsonify({
+                'response': bot_response,
+                'status': 'success',
+                'intent': best_match,
+                'score': highest_score,
+                'fallback': best_match is None,
+                'match': source,
+                'candidates': candidates
+            })
+        else:
+            # Answers are fixed text, so their JSON was encoded at load time
+            response = Response(payload, mimetype='application/json')
+        serialized = time.perf_counter()
+        
+        session_id = record_turn(tenant, session_id, session, user_message, best_match)
+        set_session_cookie(response, session_id)
+        finished = time.perf_counter()
+        
+        preprocess_seconds.observe(preprocessed - start)
+        match_seconds.observe(matched - preprocessed)
+        serialize_seconds.observe(serialized - matched)
+        request_seconds.observe(finished - start)
+        chat_succeeded.inc()
+        intent_hits.labels(best_match or 'fallback').inc()
+        if interaction_log is not None:
+            interaction_log.record(session_id, user_message, best_match, highest_score,
+                                   bot_response, finished - start, tenant)
+        return response
+    
+    except Exception as e:
+        chat_requests.inc('error')
+        return jsonify({
+            'response': 'Sorry, I encountered an error. Please try again.',
+            'status': 'error',
+            'error': str(e)
+        }), 500
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event"""
+    prefix = 'event: %s\n' % event if event else ''
+    return prefix + 'data: ' + fastjson.dumps(data).decode('utf-8') + '\n\n'
+
+def stream_reply(bot, user_message, tenant, session_id, session, start):
+    """Yield a reply as SSE chunks, one line of the answer per event"""
+    # Open the stream before any work so the client sees bytes at once
+    yield ': stream open\n\n'
+    try:
+        processed_input = bot.preprocess_input(user_message)
+        best_match, highest_score, _, _ = match_in_session(bot, processed_input, session)
+        bot_response = bot.select_response(best_match, highest_score)
+        record_turn(tenant, session_id, session, user_message, best_match)
+        # Latency is time to the answer, the same span /chat measures
+        answered = time.perf_counter()
+        request_seconds.observe(answered - start)
+        chat_succeeded.inc()
+        intent_hits.labels(best_match or 'fallback').inc()
+        if interaction_log is not None:
+            interaction_log.record(session_id, user_message, best_match, highest_score,
+                                   bot_response, answered - start, tenant)
+        for line in bot_response.splitlines(keepends=True):
+            yield sse_event({'delta': line})
+        yield sse_event({'status': 'success'}, event='done')
+    except Exception as e:
+        chat_requests.inc('error')
+        yield sse_event({'status': 'error', 'error': str(e)}, event='error')
+
+@app.route('/chat/stream', methods=['GET', 'POST'])
+@app.route('/t/<tenant>/chat/stream', methods=['GET', 'POST'])
+def chat_stream(tenant=None):
+    """Stream the bot response as Server-Sent Events"""
+    start = time.perf_counter()
+    tenant = request_tenant(tenant)
+    bot = tenant_chatbot(tenant)
+    if bot is None:
+        chat_requests.inc('invalid')
+        return unknown_tenant(tenant)
+    
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+    if not isinstance(data, (dict, MultiDict)):
+        chat_requests.inc('invalid')
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    user_message = data.get('message', '')
+    
+    if not user_message:
+        chat_requests.inc('invalid')
+        return jsonify({'error': 'No message provided'}), 400
+    if not isinstance(user_message, str):
+        chat_requests.inc('invalid')
+        return jsonify({'error': 'Message must be a string'}), 400
+    
+    # The cookie goes out with the headers, before the turn is recorded
+    session_id, session = open_session(tenant, data)
+    if session_id is None:
+        session_id = secrets.token_urlsafe(16)
+    response = Response(stream_with_context(stream_reply(bot, user_message, tenant, session_id, session, start)),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    set_session_cookie(response, session_id)
+    return response
+
+BATCH_CHUNK_SIZE = 1000
+
+def batch_message(item):
+    """Pull the message text out of one batch entry"""
+    if isinstance(item, dict):
+        item = item.get('message', '')
+    if not isinstance(item, str):
+        raise ValueError('Messages must be strings')
+    return item
+
+def ndjson_batch(bot, lines):
+    """Answer NDJSON messages chunk by chunk, one reply line per message"""
+    chunk = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            chunk.append(batch_message(fastjson.loads(line)))
+        except ValueError as e:
+            # Keep replies aligned with input lines
+            yield from ndjson_replies(bot, chunk)
+            yield fastjson.dumps({'error': str(e)}) + b'\n'
+            chunk = []
+            continue
+        if len(chunk) >= BATCH_CHUNK_SIZE:
+            yield from ndjson_replies(bot, chunk)
+            chunk = []
+    yield from ndjson_replies(bot, chunk)
+
+def ndjson_replies(bot, messages):
+    """Encode a chunk of batch replies as NDJSON lines"""
+    for bot_response in bot.get_responses(messages):
+        yield fastjson.dumps({'response': bot_response}) + b'\n'
+
+@app.route('/chat/batch', methods=['POST'])
+@app.route('/t/<tenant>/chat/batch', methods=['POST'])
+def chat_batch(tenant=None):
+    """Answer a JSON array or NDJSON stream of messages, in order"""
+    try:
+        tenant = request_tenant(tenant)
+        bot = tenant_chatbot(tenant)
+        if bot is None:
+            return unknown_tenant(tenant)
+        
+        if request.mimetype == 'application/x-ndjson':
+            return Response(stream_with_context(ndjson_batch(bot, request.stream)),
+                            mimetype='application/x-ndjson')
+
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get('messages')
+        if not isinstance(data, list):
+            return jsonify({'error': 'Expected a JSON array of messages'}), 400
+        
+        messages = [batch_message(item) for item in data]
         
         return jsonify({
-            'response': bot_response,
+            'responses': bot.get_responses(messages),
             'status': 'success'
         })
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     except Exception as e:
         return jsonify({
-            'response': 'Sorry, I encountered an error. Please try again.',
             'status': 'error',
             'error': str(e)
         }), 500
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text-format metrics"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Operator-only endpoints need "Authorization: Bearer $CHATBOT_ADMIN_TOKEN"
+# and are disabled when no token is configured
+ADMIN_TOKEN = os.environ.get('CHATBOT_ADMIN_TOKEN')
+
+def admin_authorized():
+    supplied = request.headers.get('Authorization', '')
+    return bool(ADMIN_TOKEN) and secrets.compare_digest(supplied.encode('utf-8'),
+                                                        ('Bearer ' + ADMIN_TOKEN).encode('utf-8'))
+
+@app.route('/metrics/profiler', methods=['POST'])
+def profiler_toggle():
+    """Turn the sampling profiler on or off"""
+    if not admin_authorized():
+        return jsonify({'error': 'Admin token required', 'status': 'error'}), 403 if ADMIN_TOKEN else 404
+    data = request.get_json(silent=True) or {}
+    if data.get('enabled'):
+        interval_ms = data.get('interval_ms', 5)
+        if isinstance(interval_ms, bool) or not isinstance(interval_ms, (int, float)) \
+                or not 0 < interval_ms <= 1000:
+            return jsonify({'error': 'interval_ms must be a number in (0, 1000]', 'status': 'error'}), 400
+        profiler.start(interval_ms / 1000)
+    else:
+        profiler.stop()
+    return jsonify({'profiling': profiler.running, 'interval_ms': profiler.interval * 1000})
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'Chatbot is running!'})
+    status = {'status': 'healthy', 'message': 'Chatbot is running!'}
+    if chatbot.cache is not None:
+        status['cache'] = chatbot.cache.stats()
+    if chatbot.single_flight is not None:
+        status['coalescing'] = chatbot.single_flight.stats()
+    status['knowledge_base'] = {'intents': len(chatbot.intent_keys), 'build_seconds': round(chatbot.build_seconds, 4),
+                                'from_snapshot': chatbot.from_snapshot}
+    status['sessions'] = sessions.stats()
+    if concurrency_limiter is not None:
+        status['admission'] = concurrency_limiter.stats()
+    if interaction_log is not None:
+        status['interaction_log'] = interaction_log.stats()
+    status['tenants'] = tenants.stats()
+    return jsonify(status)
+
+def shutdown():
+    """Write out what the app still buffers; for exit paths that skip atexit"""
+    if interaction_log is not None:
+        interaction_log.close()
 
 if __name__ == '__main__':
     # Get port from environment variable for deployment
@@ -0,0 +1,224 @@
+"""Low-overhead counters, histograms and a sampling profiler.
+
+Everything renders in the Prometheus text exposition format, so /metrics
+can be scraped without a client library.
+"""
+import bisect
+import collections
+import os
+import sys
+import threading
+
+# Seconds; tuned for in-process work that usually takes microseconds
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+def format_labels(names, values):
+    """Render {name="value",...} for one series"""
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append('%s="%s"' % (name, value))
+    return '{' + ','.join(pairs) + '}'
+
+class CounterChild:
+    """One labelled series of a Counter"""
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels_names = tuple(labels)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *label_values):
+        """The series for these label values; keep it to skip the lookup"""
+        child = self.children.get(label_values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(label_values, CounterChild())
+        return child
+
+    def inc(self, *label_values, amount=1):
+        self.labels(*label_values).inc(amount)
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help_text), '# TYPE %s counter' % self.name]
+        with self.lock:
+            items = sorted(self.children.items())
+        for label_values, child in items:
+            lines.append('%s%s %s' % (self.name, format_labels(self.labels_names, label_values), child.value))
+        return lines
+
+class HistogramChild:
+    """One labelled series of a Histogram"""
+    __slots__ = ('buckets', 'counts', 'total', 'count', 'lock')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Per-bucket counts; made cumulative only when rendering
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.total, self.count
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by label values"""
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels_names = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def labels(self, *label_values):
+        """The series for these label values; keep it to skip the lookup"""
+        child = self.children.get(label_values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(label_values, HistogramChild(self.buckets))
+        return child
+
+    def observe(self, value, *label_values):
+        self.labels(*label_values).observe(value)
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help_text), '# TYPE %s histogram' % self.name]
+        with self.lock:
+            items = sorted(self.children.items())
+        for label_values, child in items:
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = format_labels(self.labels_names + ('le',), label_values + (le,))
+                lines.append('%s_bucket%s %d' % (self.name, labels, cumulative))
+            labels = format_labels(self.labels_names, label_values)
+            lines.append('%s_sum%s %r' % (self.name, labels, total))
+            lines.append('%s_count%s %d' % (self.name, labels, count))
+        return lines
+
+class StackSampler:
+    """Sampling profiler: periodically records which function each thread is in.
+
+    Off by default; while running it costs one sys._current_frames() call
+    per interval and nothing on the request path.
+    """
+
+    def __init__(self, top=25):
+        self.top = top
+        self.samples = collections.Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.interval = 0.005
+
+    # Shorter intervals would have the sampler hog the GIL
+    MIN_INTERVAL = 0.001
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, interval=0.005):
+        """Start sampling every `interval` seconds (at least MIN_INTERVAL)"""
+        interval = max(interval, self.MIN_INTERVAL)
+        if self.running:
+            self.interval = interval
+            return
+        self.interval = interval
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.running:
+            self.stop_event.set()
+            self.thread.join()
+        self.thread = None
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                location = '%s:%s' % (os.path.basename(code.co_filename), code.co_name)
+                with self.lock:
+                    self.samples[location] += 1
+
+    def render(self):
+        name = 'chatbot_profile_samples_total'
+        lines = ['# HELP %s Stack samples by innermost function (sampling profiler)' % name,
+                 '# TYPE %s counter' % name]
+        with self.lock:
+            hottest = self.samples.most_common(self.top)
+        for location, count in hottest:
+            lines.append('%s%s %d' % (name, format_labels(('function',), (location,)), count))
+        return lines
+
+class Registry:
+    """Collects metrics and renders them for scraping"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """Register a callable returning extra exposition lines at scrape time"""
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+def gauge_lines(name, help_text, value):
+    """Exposition lines for a single unlabelled gauge"""
+    return ['# HELP %s %s' % (name, help_text), '# TYPE %s gauge' % name, '%s %s' % (name, value)]
+
+def counter_lines(name, help_text, value):
+    """Exposition lines for a single unlabelled counter"""
+    return ['# HELP %s %s' % (name, help_text), '# TYPE %s counter' % name, '%s %d' % (name, value)]
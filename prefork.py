@@ -0,0 +1,101 @@
+"""Pre-fork launcher: build once in the master, fork shared-nothing workers.
+
+The master imports the app, which builds the chatbot, its indexes and the
+UI bundle, then warms it up and forks. Workers inherit all of that
+copy-on-write, so startup cost is paid once and the read-only pages stay
+shared between workers.
+
+    CHATBOT_WORKERS=8 python prefork.py
+
+Settings (environment variables):
+    PORT                  listen port (default 5000)
+    CHATBOT_WORKERS       worker processes (default: CPU count)
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+def build_app():
+    """Import and warm the app in the master"""
+    from main import app, chatbot
+    # Touch every code path a first request would, so nothing is built lazily per worker
+    for message in ('courses', 'admission', 'fees', 'facilities', 'what is the weather'):
+        chatbot.get_response(message)
+    # Move everything built so far out of the GC's reach: collections in a
+    # worker would otherwise write to shared objects and copy their pages
+    gc.collect()
+    gc.freeze()
+    return app
+
+def serve(app, sock):
+    """Worker loop: serve requests on the inherited listening socket"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Ctrl+C reaches the whole process group; the master turns it into a
+    # SIGTERM for each live worker. A respawned worker would otherwise run
+    # the master's handler over its stale copy of the worker pids.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    host, port = sock.getsockname()[:2]
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+def spawn(app, sock):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            serve(app, sock)
+        finally:
+            # os._exit skips atexit, so flush buffered interactions first
+            from main import shutdown
+            try:
+                shutdown()
+            finally:
+                os._exit(0)
+    return pid
+
+def main():
+    port = int(os.environ.get('PORT', 5000))
+    workers = int(os.environ.get('CHATBOT_WORKERS', os.cpu_count() or 1))
+
+    started = time.perf_counter()
+    app = build_app()
+    sock = socket.create_server(('0.0.0.0', port), backlog=2048, reuse_port=False)
+    sock.set_inheritable(True)
+
+    children = {spawn(app, sock) for _ in range(workers)}
+    print(f"🤖 College Chatbot pre-forked {workers} workers in {time.perf_counter() - started:.3f}s")
+    print(f"📡 Server will run on http://localhost:{port}")
+    print("💡 Press Ctrl+C to stop the server", flush=True)
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Replace workers that die; exit once all are gone after a stop
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        children.discard(pid)
+        if not stopping:
+            children.add(spawn(app, sock))
+
+if __name__ == '__main__':
+    main()
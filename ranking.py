@@ -0,0 +1,136 @@
+"""BM25 intent ranking over the knowledge base (optional, needs NumPy).
+
+Each intent is a document made of its keywords (weighted up) and its
+response text. The term weights are precomputed into a sparse
+term -> (intent, weight) matrix at startup, so scoring one query, or a
+whole batch, is a single sparse matrix-vector product done with
+np.bincount.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Words too common to say anything about intent
+STOPWORDS = frozenset('''
+a an and any are as at be by can do does for from get have how i if in is it
+me my of on or our so that the there this to us we what when where which who
+will with you your
+'''.split())
+
+def intent_stopwords(responses, preprocess):
+    """STOPWORDS minus any word the intents use as a keyword"""
+    # A stopword that is also a keyword ('where') still carries meaning
+    keyword_tokens = {token for intent in responses.values()
+                      for keyword in intent['keywords']
+                      for token in preprocess(keyword).split()}
+    return STOPWORDS - keyword_tokens
+
+def tokenize(processed_input, stopwords):
+    """Words of a preprocessed message, without stopwords"""
+    return [token for token in processed_input.split() if token not in stopwords]
+
+class BM25Ranker:
+    """Ranks intents for preprocessed queries with BM25"""
+
+    def __init__(self, responses, preprocess, k1=1.2, b=0.75, keyword_weight=3, min_score=1.0):
+        if np is None:
+            raise RuntimeError('NumPy is required for BM25 ranking (pip install numpy)')
+        self.intent_keys = list(responses)
+        self.min_score = min_score
+
+        self.stopwords = intent_stopwords(responses, preprocess)
+
+        # Term frequencies per intent document
+        documents = []
+        for key in self.intent_keys:
+            tf = {}
+            for keyword in responses[key]['keywords']:
+                for token in tokenize(preprocess(keyword), self.stopwords):
+                    tf[token] = tf.get(token, 0) + keyword_weight
+            for token in tokenize(preprocess(responses[key]['response']), self.stopwords):
+                tf[token] = tf.get(token, 0) + 1
+            documents.append(tf)
+
+        lengths = np.array([sum(tf.values()) for tf in documents], dtype=np.float64)
+        average_length = lengths.mean() if len(lengths) else 1.0
+        n_docs = len(documents)
+
+        postings = {}
+        for doc_id, tf in enumerate(documents):
+            for token, count in tf.items():
+                postings.setdefault(token, []).append((doc_id, count))
+
+        # CSC layout: column `term` owns rows indptr[term]:indptr[term + 1]
+        self.vocabulary = {}
+        indptr = [0]
+        rows = []
+        weights = []
+        for token, entries in postings.items():
+            self.vocabulary[token] = len(self.vocabulary)
+            idf = np.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            for doc_id, count in entries:
+                norm = k1 * (1 - b + b * lengths[doc_id] / average_length)
+                rows.append(doc_id)
+                weights.append(idf * count * (k1 + 1) / (count + norm))
+            indptr.append(len(rows))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.rows = np.array(rows, dtype=np.int64)
+        self.weights = np.array(weights, dtype=np.float64)
+
+    def query_columns(self, processed_input):
+        """Vocabulary columns of a query's distinct known terms"""
+        columns = {self.vocabulary[token] for token in tokenize(processed_input, self.stopwords)
+                   if token in self.vocabulary}
+        return np.fromiter(columns, dtype=np.int64, count=len(columns))
+
+    def score_batch(self, processed_inputs):
+        """Score matrix of shape (queries, intents) for a batch of queries"""
+        n_intents = len(self.intent_keys)
+        entry_rows = []
+        entry_cols = []
+        for query_id, processed_input in enumerate(processed_inputs):
+            columns = self.query_columns(processed_input)
+            entry_rows.append(np.full(len(columns), query_id, dtype=np.int64))
+            entry_cols.append(columns)
+        if not processed_inputs:
+            return np.zeros((0, n_intents))
+        query_ids = np.concatenate(entry_rows)
+        columns = np.concatenate(entry_cols)
+
+        # Expand every (query, term) pair into that term's postings, then
+        # sum weights per (query, intent) cell in one bincount
+        starts = self.indptr[columns]
+        counts = self.indptr[columns + 1] - starts
+        total = int(counts.sum())
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        cells = np.repeat(query_ids, counts) * n_intents + self.rows[offsets]
+        scores = np.bincount(cells, weights=self.weights[offsets],
+                             minlength=len(processed_inputs) * n_intents)
+        return scores.reshape(len(processed_inputs), n_intents)
+
+    def top_k(self, processed_input, k=3):
+        """Best k (intent, score) pairs with a positive score"""
+        return self.top_k_batch([processed_input], k)[0]
+
+    def top_k_batch(self, processed_inputs, k=3):
+        """Best k (intent, score) pairs for each query in a batch"""
+        scores = self.score_batch(processed_inputs)
+        k = min(k, scores.shape[1])
+        results = []
+        for row in scores:
+            # Stable sort keeps earlier intents first on ties, as keyword scoring does
+            best = np.argsort(-row, kind='stable')[:k]
+            results.append([(self.intent_keys[i], float(row[i])) for i in best if row[i] > 0])
+        return results
+
+    def best_matches(self, processed_inputs):
+        """(intent, score) per query, or (None, score) below min_score"""
+        scores = self.score_batch(processed_inputs)
+        if not scores.shape[1]:
+            return [(None, 0.0)] * len(processed_inputs)
+        # argmax returns the first maximum, so earlier intents win ties
+        best = scores.argmax(axis=1)
+        best_scores = scores[np.arange(len(best)), best]
+        return [(self.intent_keys[i] if score >= self.min_score else None, float(score))
+                for i, score in zip(best.tolist(), best_scores.tolist())]
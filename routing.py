@@ -0,0 +1,74 @@
+"""Two-stage keyword scoring for large knowledge bases: categories, then intents.
+
+Intents are grouped by their category. For a question, matched keywords
+are taken rarest first, and each one nominates the categories it occurs
+in, most promising first. A nominated category is searched (every intent
+in it scored) only while its upper bound can still beat, or tie earlier
+than, the best intent found so far. The bound is what the keyword can
+add, plus the most the keywords not yet taken could add. Common
+keywords like "fees", present in every department, rarely get to
+nominate anything: a course name has already settled the answer.
+
+The result is exactly what flat scoring over every intent returns, but a
+question only pays for the few categories that can win.
+"""
+from collections import Counter
+
+class CategoryRouter:
+    """Keyword scoring routed through the intents' categories"""
+
+    def __init__(self, intent_keys, responses, keyword_postings):
+        self.intent_keys = intent_keys
+        category_ids = {}
+        intent_category = [category_ids.setdefault(responses[key].get('category') or '', len(category_ids))
+                           for key in intent_keys]
+        self.categories = list(category_ids)
+
+        # keyword -> {category: ranks listing it, once per listing}
+        self.postings = {}
+        # keyword -> [(most listings by one intent, first rank, category)],
+        # best category for the keyword first
+        self.nominations = {}
+        for keyword, ranks in keyword_postings.items():
+            by_category = {}
+            for rank in ranks:
+                by_category.setdefault(intent_category[rank], []).append(rank)
+            self.postings[keyword] = by_category
+            self.nominations[keyword] = sorted(
+                ((max(Counter(ranks).values()), ranks[0], category)
+                 for category, ranks in by_category.items()),
+                key=lambda nomination: (-nomination[0], nomination[1]))
+
+    def best_match(self, processed_input, matched):
+        """(intent, score) like flat best_match(score_intents(...)), earliest intent on ties"""
+        points = {keyword: 10 if keyword == processed_input else 5 for keyword in matched}
+        keywords = sorted(matched, key=lambda keyword: len(self.postings[keyword]))
+        # remaining[i]: the most keywords[i:] can add to any one intent
+        remaining = [0] * (len(keywords) + 1)
+        for i in range(len(keywords) - 1, -1, -1):
+            keyword = keywords[i]
+            remaining[i] = remaining[i + 1] + points[keyword] * self.nominations[keyword][0][0]
+
+        best_rank = None
+        best_score = 0
+        searched = set()
+        for i, keyword in enumerate(keywords):
+            if remaining[i] < best_score:
+                break
+            for multiplicity, first_rank, category in self.nominations[keyword]:
+                bound = points[keyword] * multiplicity + remaining[i + 1]
+                # Later nominations are no better, so none of them can win either
+                if bound < best_score or (bound == best_score and first_rank > best_rank):
+                    break
+                if category in searched:
+                    continue
+                searched.add(category)
+                scores = {}
+                for other, other_points in points.items():
+                    for rank in self.postings[other].get(category, ()):
+                        scores[rank] = scores.get(rank, 0) + other_points
+                for rank, score in scores.items():
+                    if score > best_score or (score == best_score and rank < best_rank):
+                        best_rank = rank
+                        best_score = score
+        return (self.intent_keys[best_rank] if best_rank is not None else None), best_score
@@ -0,0 +1,206 @@
+"""Semantic intent matching with hashed n-gram embeddings (optional, needs NumPy).
+
+Text is embedded without a model: words, word bigrams and character
+n-grams are hashed into a fixed number of dimensions, weighted by how
+rare the word is across intents, and L2-normalised. Character n-grams
+let "year" meet "years" and "fee" meet "fees", and word weights make the
+rare words of a question count most. Each intent is embedded once, as
+one passage for its keywords and category plus one per response line,
+and scores as its best passage.
+
+Queries are answered by cosine similarity against the intent vectors:
+    brute force   one matrix product over every passage (small knowledge bases)
+    IVF           passages are clustered with k-means, and only the
+                  `n_probe` clusters closest to the query are searched
+"""
+import hashlib
+import math
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ranking import intent_stopwords, tokenize
+
+@lru_cache(maxsize=65536)
+def hashed_features(feature, dim):
+    """(bucket, sign) for a feature, the same in every process"""
+    # crc32 is linear, so similar features collide far more often than chance
+    h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+    return h % dim, 1.0 if h >> 63 else -1.0
+
+def char_ngrams(token, sizes=(3, 4)):
+    marked = '<' + token + '>'
+    return [marked[i:i + n] for n in sizes for i in range(len(marked) - n + 1)]
+
+class SemanticIndex:
+    """Nearest-intent search over hashed n-gram embeddings"""
+    # Weight of a word's character n-grams, shared between them, relative to the word
+    CHAR_WEIGHT = 0.6
+    FEATURE_CACHE_SIZE = 100000
+
+    def __init__(self, responses, preprocess, dim=2048, min_similarity=0.15,
+                 ivf_threshold=1000, n_probe=8):
+        if np is None:
+            raise RuntimeError('NumPy is required for semantic matching (pip install numpy)')
+        self.intent_keys = list(responses)
+        self.dim = dim
+        self.min_similarity = min_similarity
+        self.n_probe = n_probe
+        self.feature_cache = {}
+
+        self.stopwords = intent_stopwords(responses, preprocess)
+
+        # Every intent is embedded as several passages: its keywords and
+        # category, then each line of its response. A question usually
+        # echoes one line ("per year"), which a whole-response vector would
+        # dilute. Passages are stored intent by intent.
+        documents = []
+        passage_intents = []
+        for rank, key in enumerate(self.intent_keys):
+            intent = responses[key]
+            passages = [' '.join(intent['keywords'] + [intent.get('category') or ''])]
+            passages += intent['response'].splitlines()
+            for i, passage in enumerate(passages):
+                tokens = tokenize(preprocess(passage), self.stopwords)
+                # The first passage is always kept so every intent owns a row
+                if tokens or i == 0:
+                    documents.append(tokens)
+                    passage_intents.append(rank)
+        self.passage_intents = np.array(passage_intents, dtype=np.int64)
+        # Rows of intent r start at intent_starts[r]
+        self.intent_starts = np.searchsorted(self.passage_intents, np.arange(len(self.intent_keys)))
+
+        # Words no intent uses get the highest weight: they are rare by definition
+        n_docs = len(self.intent_keys)
+        intent_tokens = {}
+        for rank, tokens in zip(passage_intents, documents):
+            intent_tokens.setdefault(rank, set()).update(tokens)
+        document_frequency = {}
+        for tokens in intent_tokens.values():
+            for token in tokens:
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        self.idf = {token: math.log((n_docs + 1) / (df + 1)) + 1
+                    for token, df in document_frequency.items()}
+        self.default_idf = math.log(n_docs + 1) + 1
+
+        self.vectors = self.embed_tokens(documents)
+
+        # Inverted file: cluster passages, and search only the clusters nearest a query
+        self.centroids = None
+        if n_docs >= ivf_threshold:
+            self.build_ivf(max(1, int(math.sqrt(len(documents)))))
+
+    def token_features(self, token):
+        """Hashed (buckets, values) of a word and its character n-grams"""
+        features = self.feature_cache.get(token)
+        if features is None:
+            weight = self.idf.get(token, self.default_idf)
+            grams = char_ngrams(token)
+            gram_weight = weight * self.CHAR_WEIGHT / math.sqrt(len(grams))
+            buckets = []
+            values = []
+            for feature, feature_weight in [('w:' + token, weight)] + [(gram, gram_weight) for gram in grams]:
+                bucket, sign = hashed_features(feature, self.dim)
+                buckets.append(bucket)
+                values.append(sign * feature_weight)
+            features = (buckets, values)
+            if len(self.feature_cache) >= self.FEATURE_CACHE_SIZE:
+                self.feature_cache.clear()
+            self.feature_cache[token] = features
+        return features
+
+    def embed_tokens(self, token_lists):
+        """Normalised embedding matrix, one row per token list"""
+        rows = []
+        buckets = []
+        values = []
+        for row, tokens in enumerate(token_lists):
+            start = len(buckets)
+            for i, token in enumerate(tokens):
+                token_buckets, token_values = self.token_features(token)
+                buckets += token_buckets
+                values += token_values
+                if i + 1 < len(tokens):
+                    bucket, sign = hashed_features('b:' + token + ' ' + tokens[i + 1], self.dim)
+                    buckets.append(bucket)
+                    values.append(sign * self.idf.get(token, self.default_idf))
+            rows += [row] * (len(buckets) - start)
+        matrix = np.bincount(np.array(rows, dtype=np.int64) * self.dim + np.array(buckets, dtype=np.int64),
+                             weights=np.array(values, dtype=np.float64),
+                             minlength=len(token_lists) * self.dim).reshape(len(token_lists), self.dim)
+        norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))[:, None]
+        norms[norms == 0] = 1
+        return (matrix / norms).astype(np.float32)
+
+    def embed(self, processed_inputs):
+        """Embed a batch of preprocessed queries in one pass"""
+        return self.embed_tokens([tokenize(processed_input, self.stopwords)
+                                  for processed_input in processed_inputs])
+
+    def build_ivf(self, n_lists, iterations=10):
+        """Spherical k-means over the passage vectors, stored cluster by cluster"""
+        rng = np.random.default_rng(0)
+        centroids = self.vectors[rng.choice(len(self.vectors), n_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = (self.vectors @ centroids.T).argmax(axis=1)
+            order = np.argsort(assignment, kind='stable')
+            clusters, starts = np.unique(assignment[order], return_index=True)
+            sums = np.add.reduceat(self.vectors[order], starts, axis=0)
+            # An emptied cluster keeps its old centroid
+            centroids[clusters] = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        assignment = (self.vectors @ centroids.T).argmax(axis=1)
+        # Cluster c owns rows offsets[c]:offsets[c + 1], so probing a
+        # cluster reads one contiguous block
+        order = np.argsort(assignment, kind='stable')
+        self.vectors = self.vectors[order]
+        self.passage_intents = self.passage_intents[order]
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        self.centroids = centroids
+
+    def search_batch(self, processed_inputs, k=1):
+        """Best k (intent rank, similarity) pairs per query"""
+        queries = self.embed(processed_inputs)
+        results = []
+        if self.centroids is None:
+            # An intent scores as its best passage
+            similarities = np.maximum.reduceat(queries @ self.vectors.T, self.intent_starts, axis=1)
+            for row in similarities:
+                # Stable sort keeps earlier intents first on ties
+                best = np.argsort(-row, kind='stable')[:k]
+                results.append([(int(i), float(row[i])) for i in best])
+            return results
+        for query in queries:
+            nearest = np.argsort(-(self.centroids @ query))[:self.n_probe]
+            rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in nearest])
+            similarities = np.concatenate([self.vectors[self.offsets[c]:self.offsets[c + 1]] @ query
+                                           for c in nearest])
+            best = []
+            seen = set()
+            # Best passage first; ties go to the earlier intent
+            for i in np.lexsort((self.passage_intents[rows], -similarities)).tolist():
+                rank = int(self.passage_intents[rows[i]])
+                if rank not in seen:
+                    seen.add(rank)
+                    best.append((rank, float(similarities[i])))
+                    if len(best) == k:
+                        break
+            results.append(best)
+        return results
+
+    def top_k(self, processed_input, k=3):
+        """Best k (intent, similarity) pairs above min_similarity"""
+        return [(self.intent_keys[rank], similarity)
+                for rank, similarity in self.search_batch([processed_input], k)[0]
+                if similarity >= self.min_similarity]
+
+    def best_matches(self, processed_inputs):
+        """(intent, similarity) per query, or (None, similarity) below min_similarity"""
+        results = []
+        for best in self.search_batch(processed_inputs):
+            rank, similarity = best[0] if best else (None, 0.0)
+            results.append((self.intent_keys[rank] if similarity >= self.min_similarity else None,
+                            similarity))
+        return results
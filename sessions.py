@@ -0,0 +1,135 @@
+"""Per-user conversation state with bounded memory.
+
+A session keeps the last few turns and the last matched intent, which is
+enough to resolve follow-ups like "what about its duration?". Two
+backends share one interface:
+
+    MemorySessionStore   in-process LRU with TTL (default)
+    SQLiteSessionStore   one SQLite file shared by every worker
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Stored turns are truncated; sessions exist for context, not transcripts
+MAX_MESSAGE_CHARS = 200
+
+class Session:
+    """Compact per-session record"""
+    __slots__ = ('last_intent', 'turns')
+
+    def __init__(self, last_intent=None, turns=()):
+        self.last_intent = last_intent
+        self.turns = list(turns)
+
+    def add_turn(self, message, intent, max_turns):
+        self.turns.append((message[:MAX_MESSAGE_CHARS], intent))
+        del self.turns[:-max_turns]
+        if intent is not None:
+            self.last_intent = intent
+
+    def dumps(self):
+        return json.dumps([self.last_intent, self.turns], ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def loads(cls, data):
+        last_intent, turns = json.loads(data)
+        return cls(last_intent, [tuple(turn) for turn in turns])
+
+class MemorySessionStore:
+    """In-process sessions, capped by count and expired by idle time"""
+
+    def __init__(self, max_sessions=10000, ttl=1800):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return None
+            session, touched = entry
+            if time.monotonic() - touched > self.ttl:
+                del self.sessions[session_id]
+                self.expirations += 1
+                return None
+            return session
+
+    def put(self, session_id, session):
+        with self.lock:
+            self.sessions[session_id] = (session, time.monotonic())
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {'backend': 'memory', 'sessions': len(self.sessions), 'max_sessions': self.max_sessions,
+                    'evictions': self.evictions, 'expirations': self.expirations}
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file, so every worker process sees them"""
+
+    # Expired and over-cap rows are pruned once per this many writes
+    PRUNE_EVERY = 500
+
+    def __init__(self, path, max_sessions=10000, ttl=1800):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.local = threading.local()
+        self.writes = 0
+        with self.connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS sessions '
+                         '(id TEXT PRIMARY KEY, touched REAL NOT NULL, data TEXT NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS sessions_touched ON sessions (touched)')
+
+    def connection(self):
+        # sqlite3 connections must stay on the thread that opened them
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self.connection().execute(
+            'SELECT data FROM sessions WHERE id = ? AND touched > ?',
+            (session_id, time.time() - self.ttl)).fetchone()
+        return Session.loads(row[0]) if row else None
+
+    def put(self, session_id, session):
+        with self.connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)',
+                         (session_id, time.time(), session.dumps()))
+        self.writes += 1
+        if self.writes % self.PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        """Drop expired sessions, then the least recently used over the cap"""
+        with self.connection() as conn:
+            conn.execute('DELETE FROM sessions WHERE touched <= ?', (time.time() - self.ttl,))
+            conn.execute('DELETE FROM sessions WHERE id IN (SELECT id FROM sessions '
+                         'ORDER BY touched DESC LIMIT -1 OFFSET ?)', (self.max_sessions,))
+
+    def stats(self):
+        count = self.connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        return {'backend': 'sqlite', 'sessions': count, 'max_sessions': self.max_sessions}
+
+def create_session_store(backend='memory', path='sessions.db', max_sessions=10000, ttl=1800):
+    """Build the configured session backend"""
+    if backend == 'memory':
+        return MemorySessionStore(max_sessions, ttl)
+    if backend == 'sqlite':
+        return SQLiteSessionStore(path, max_sessions, ttl)
+    raise ValueError('Unknown session backend: %s' % backend)
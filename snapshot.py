@@ -0,0 +1,183 @@
+"""Snapshots of a compiled chatbot, for fast cold starts.
+
+Building a chatbot compiles its knowledge base: keyword postings and the
+keyword automaton, the spelling vocabulary, routing tables, the encoded
+replies and, when enabled, the BM25 and semantic matchers. For a large
+knowledge base that takes seconds on every start. A snapshot stores all
+of it in one file next to the knowledge base (`knowledge_base.snapshot`)
+that the next process reads with a single read instead of rebuilding.
+
+Snapshots are pickles, and loading a pickle can run code, so they are
+signed. They are only written and read when a deploy secret is
+configured (CHATBOT_SNAPSHOT_SECRET). The header holds a format version,
+a key and an HMAC-SHA256 of the key and body under that secret. The key
+hashes the knowledge base content, the matcher options, the Python
+version and the source of the modules that build the snapshot. A
+snapshot with a different key is stale and rebuilt. One whose signature
+does not verify was damaged or not written by this deploy, and it is
+never unpickled.
+
+Build by hand with:  CHATBOT_SNAPSHOT_SECRET=... python snapshot.py knowledge_base.json
+"""
+import array
+import functools
+import gc
+import hashlib
+import hmac
+import io
+import logging
+import os
+import pickle
+import re
+import sys
+import tempfile
+
+import _sre
+
+try:
+    from re import _compiler as sre_compile, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_compile
+    import sre_parse
+
+from knowledge_base import replace_file, source_hash
+
+FORMAT_VERSION = 1
+MAGIC = b'CHATBOT-SNAPSHOT'
+
+logger = logging.getLogger(__name__)
+
+def snapshot_path(source):
+    """Where the snapshot of a knowledge base lives"""
+    return os.path.splitext(source)[0] + '.snapshot'
+
+@functools.lru_cache(maxsize=None)
+def code_hash(paths):
+    """Hash of the source files whose classes end up in a snapshot"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def snapshot_key(source, options, classes):
+    """Hash of everything the compiled state depends on.
+
+    `classes` are the classes of the pickled objects. Their modules'
+    source is part of the key, so a deploy that changes any of them gets
+    new snapshots without anyone having to bump FORMAT_VERSION.
+    """
+    # This module and the knowledge base loader shape the state as well
+    paths = sorted({sys.modules[cls.__module__].__file__ for cls in classes}
+                   | {__file__, sys.modules[source_hash.__module__].__file__})
+    parts = [str(FORMAT_VERSION), sys.implementation.cache_tag, source_hash(source),
+             repr(sorted(options.items())), code_hash(tuple(paths))]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+def restore_pattern(pattern, flags, code, groups, groupindex, indexgroup, magic):
+    """Rebuild a compiled regex from its saved engine code, or recompile it"""
+    # Parsing a large pattern costs far more than the engine's own setup,
+    # so reuse the code when it was produced by this same regex engine
+    if magic == _sre.MAGIC:
+        try:
+            return _sre.compile(pattern, flags, code.tolist(), groups, groupindex, indexgroup)
+        except (TypeError, ValueError, OverflowError, RuntimeError):
+            pass
+    return re.compile(pattern, flags)
+
+class SnapshotPickler(pickle.Pickler):
+    """Pickler that saves regexes as engine code rather than pattern source"""
+
+    def reducer_override(self, obj):
+        if not isinstance(obj, re.Pattern):
+            return NotImplemented
+        # Same steps as re.compile, keeping the intermediate code
+        parsed = sre_parse.parse(obj.pattern, obj.flags)
+        # Opcodes are named int constants; an array stores them as plain numbers
+        code = array.array('I', sre_compile._code(parsed, obj.flags))
+        indexgroup = [None] * parsed.state.groups
+        for name, index in parsed.state.groupdict.items():
+            indexgroup[index] = name
+        return restore_pattern, (obj.pattern, obj.flags | parsed.state.flags, code,
+                                 parsed.state.groups - 1, parsed.state.groupdict,
+                                 tuple(indexgroup), _sre.MAGIC)
+
+def signature(secret, key, body):
+    """HMAC of a snapshot's key and body under the deploy secret"""
+    mac = hmac.new(secret, key.encode('ascii'), hashlib.sha256)
+    mac.update(body)
+    return mac.hexdigest().encode('ascii')
+
+def write_snapshot(path, key, state, secret):
+    """Write state under key, signed with secret, replacing the file atomically"""
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        buffer = io.BytesIO()
+        SnapshotPickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(state)
+        body = buffer.getvalue()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'%s %d %s %s\n' % (MAGIC, FORMAT_VERSION, key.encode('ascii'), signature(secret, key, body)))
+            f.write(body)
+        replace_file(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+def read_snapshot(path, key, secret):
+    """The state saved under key, or None if the file is missing, stale or fails verification"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        # Unreadable (wrong owner, a directory): a snapshot only saves time
+        logger.warning('Could not read snapshot %s (%s), rebuilding', path, e)
+        return None
+    end = data.find(b'\n')
+    header = data[:end].split(b' ') if end != -1 else []
+    if len(header) != 4 or header[0] != MAGIC or header[1] != b'%d' % FORMAT_VERSION:
+        return None
+    if header[2].decode('ascii', 'replace') != key:
+        return None
+    body = memoryview(data)[end + 1:]
+    if not hmac.compare_digest(signature(secret, key, body), header[3]):
+        logger.warning('Snapshot %s failed verification, rebuilding', path)
+        return None
+    # The state is hundreds of thousands of small objects that all stay
+    # alive; collecting while they are created only slows loading down
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(body)
+    except Exception:
+        logger.warning('Snapshot %s could not be loaded, rebuilding', path, exc_info=True)
+        return None
+    finally:
+        if enabled:
+            gc.enable()
+
+def save_snapshot(path, key, state, secret):
+    """write_snapshot, logging instead of failing"""
+    # A snapshot only saves time, so nothing about writing one may stop a
+    # start: a read-only disk, an object that cannot be pickled, or
+    # regex engine internals that moved in a new Python
+    try:
+        return write_snapshot(path, key, state, secret)
+    except Exception:
+        logger.warning('Could not write snapshot %s', path, exc_info=True)
+        return None
+
+if __name__ == '__main__':
+    import time
+    from college_chatbot import create_chatbot
+    if not os.environ.get('CHATBOT_SNAPSHOT_SECRET'):
+        sys.exit('Set CHATBOT_SNAPSHOT_SECRET to the secret the servers will use')
+    for source in sys.argv[1:] or ['knowledge_base.json']:
+        start = time.perf_counter()
+        # Built with the same CHATBOT_* options the server will use
+        chatbot = create_chatbot(source)
+        elapsed = (time.perf_counter() - start) * 1000
+        action = 'Up to date' if chatbot.from_snapshot else 'Built'
+        print(f"📦 {action}: {snapshot_path(source)} ({elapsed:.1f} ms)")
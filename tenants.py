@@ -0,0 +1,100 @@
+"""Per-tenant chatbots for serving many colleges from one process.
+
+Each tenant is a knowledge base file named after it in one directory
+(`tenants/mit.json`, `tenants/iitb.yaml`, ...). A tenant's chatbot is
+built on its first request. Only the most recently used `max_resident`
+are kept; the rest are dropped and rebuilt from their compiled knowledge
+base when asked for again.
+"""
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from knowledge_base import file_signature
+
+TENANT_NAME = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+EXTENSIONS = ('.json', '.yaml', '.yml')
+
+logger = logging.getLogger(__name__)
+
+class TenantRegistry:
+    """LRU of tenant chatbots, built lazily from `directory`"""
+
+    def __init__(self, directory, factory, max_resident=50, reload_interval=2):
+        self.directory = directory
+        self.factory = factory
+        self.max_resident = max_resident
+        # 0 or less: a tenant's file is never re-checked once built
+        self.reload_interval = reload_interval if reload_interval > 0 else math.inf
+        # name -> [chatbot, source signature, next reload check]
+        self.resident = OrderedDict()
+        self.lock = threading.Lock()
+        # One build per tenant at a time; other requests for it wait
+        self.build_locks = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def source(self, name):
+        """Knowledge base file of a tenant, or None"""
+        if not TENANT_NAME.match(name):
+            return None
+        for extension in EXTENSIONS:
+            path = os.path.join(self.directory, name + extension)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def get(self, name):
+        """The tenant's chatbot, or None for an unknown tenant"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.resident.get(name)
+            if entry is not None:
+                self.resident.move_to_end(name)
+                if now < entry[2]:
+                    return entry[0]
+            build_lock = self.build_locks.setdefault(name, threading.Lock())
+
+        with build_lock:
+            with self.lock:
+                current = self.resident.get(name)
+                if current is not None and current is not entry and now < current[2]:
+                    # Built or re-checked by another request meanwhile
+                    return current[0]
+            path = self.source(name)
+            if path is None:
+                with self.lock:
+                    self.resident.pop(name, None)
+                    self.build_locks.pop(name, None)
+                return None
+            signature = file_signature(path)
+            if entry is not None and entry[1] == signature:
+                chatbot = entry[0]
+            else:
+                try:
+                    chatbot = self.factory(path)
+                except Exception:
+                    if entry is None:
+                        raise
+                    # A broken edit is reported once; the tenant keeps its last good knowledge base
+                    logger.exception('Reloading tenant %s failed, keeping the current one', name)
+                    chatbot = entry[0]
+                else:
+                    self.loads += 1
+            with self.lock:
+                self.resident[name] = [chatbot, signature, now + self.reload_interval]
+                self.resident.move_to_end(name)
+                while len(self.resident) > self.max_resident:
+                    evicted, _ = self.resident.popitem(last=False)
+                    self.build_locks.pop(evicted, None)
+                    self.evictions += 1
+            return chatbot
+
+    def stats(self):
+        with self.lock:
+            return {'resident': len(self.resident), 'max_resident': self.max_resident,
+                    'loads': self.loads, 'evictions': self.evictions}
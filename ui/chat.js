@@ -0,0 +1,126 @@
+const chatMessages = document.getElementById('chatMessages');
+const chatInput = document.getElementById('chatInput');
+const chatForm = document.getElementById('chatForm');
+const typingIndicator = document.getElementById('typingIndicator');
+const streamToggle = document.getElementById('streamToggle');
+
+chatForm.addEventListener('submit', async (e) => {
+    e.preventDefault();
+
+    const userInput = chatInput.value.trim();
+    if (!userInput) return;
+
+    // Add user message
+    addMessage(userInput, 'user');
+    chatInput.value = '';
+
+    // Show typing indicator
+    showTypingIndicator();
+
+    try {
+        if (streamToggle.checked) {
+            await streamReply(userInput);
+        } else {
+            // Send message to Python backend
+            const response = await fetch('/chat', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ message: userInput })
+            });
+
+            const data = await response.json();
+
+            // Hide typing indicator and show response
+            hideTypingIndicator();
+            addMessage(data.response, 'bot');
+        }
+
+    } catch (error) {
+        hideTypingIndicator();
+        addMessage('Sorry, I encountered an error. Please try again.', 'bot');
+    }
+});
+
+streamToggle.checked = localStorage.getItem('chatMode') !== 'json';
+streamToggle.addEventListener('change', () => {
+    localStorage.setItem('chatMode', streamToggle.checked ? 'stream' : 'json');
+});
+
+async function streamReply(userInput) {
+    // Read Server-Sent Events from /chat/stream and render each chunk as it arrives
+    const response = await fetch('/chat/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ message: userInput })
+    });
+    if (!response.ok) throw new Error(response.statusText);
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let contentDiv = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        for (const event of events) {
+            const data = event.split('\n')
+                .filter(line => line.startsWith('data: '))
+                .map(line => line.slice(6))
+                .join('\n');
+            if (!data) continue;
+            const chunk = JSON.parse(data);
+            if (chunk.delta === undefined) continue;
+            if (!contentDiv) {
+                hideTypingIndicator();
+                contentDiv = addMessage('', 'bot');
+            }
+            contentDiv.textContent += chunk.delta;
+            scrollToBottom();
+        }
+    }
+
+    if (!contentDiv) throw new Error('Empty stream');
+}
+
+function addMessage(content, sender) {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${sender}`;
+
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'message-content';
+    contentDiv.textContent = content;
+
+    messageDiv.appendChild(contentDiv);
+    chatMessages.insertBefore(messageDiv, typingIndicator);
+    scrollToBottom();
+    return contentDiv;
+}
+
+function showTypingIndicator() {
+    typingIndicator.style.display = 'flex';
+    scrollToBottom();
+}
+
+function hideTypingIndicator() {
+    typingIndicator.style.display = 'none';
+}
+
+function scrollToBottom() {
+    setTimeout(() => {
+        chatMessages.scrollTop = chatMessages.scrollHeight;
+    }, 100);
+}
+
+function askQuestion(question) {
+    chatInput.value = question;
+    chatForm.dispatchEvent(new Event('submit'));
+}
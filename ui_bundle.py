@@ -0,0 +1,85 @@
+"""Static bundle for the embedded chat UI.
+
+The page, stylesheet and script in ui/ are minified once at startup,
+fingerprinted by content hash and pre-compressed (gzip always, brotli
+when the `brotli` package is installed). Requests are then served from
+memory with strong ETags.
+"""
+import gzip
+import hashlib
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+UI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ui')
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_SPACE = re.compile(r'\s+')
+CSS_PUNCTUATION = re.compile(r'\s*([{};:,>])\s*')
+
+def minify_css(css):
+    """Drop comments and whitespace that CSS does not need"""
+    css = CSS_COMMENT.sub('', css)
+    css = CSS_SPACE.sub(' ', css)
+    css = CSS_PUNCTUATION.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def minify_lines(text, comment=None):
+    """Strip indentation, blank lines and full-line comments.
+
+    Line breaks are kept, so JavaScript's automatic semicolons and the
+    chat bubble's `white-space: pre-line` text behave exactly as before.
+    """
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines
+                     if line and not (comment and line.startswith(comment)))
+
+class Asset:
+    """One file with its precompressed variants and ETags"""
+
+    def __init__(self, name, body, mimetype):
+        self.name = name
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.variants = {None: body, 'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=11)
+
+    def negotiate(self, accept_encodings):
+        """Pick the smallest variant the client accepts"""
+        encoding = None
+        for candidate in ('br', 'gzip'):
+            if candidate in self.variants and candidate in accept_encodings:
+                encoding = candidate
+                break
+        return encoding, self.variants[encoding]
+
+    def etag(self, encoding):
+        """Strong ETag, distinct per content encoding"""
+        return self.digest + ('-' + encoding if encoding else '')
+
+def build_bundle(ui_dir=UI_DIR):
+    """Minify and compress ui/, returning (page, {asset url name: Asset})"""
+    with open(os.path.join(ui_dir, 'chat.css'), encoding='utf-8') as f:
+        css = minify_css(f.read()).encode('utf-8')
+    with open(os.path.join(ui_dir, 'chat.js'), encoding='utf-8') as f:
+        js = minify_lines(f.read(), comment='//').encode('utf-8')
+
+    assets = {}
+    for name, body, mimetype in (('chat.css', css, 'text/css'),
+                                 ('chat.js', js, 'application/javascript')):
+        asset = Asset(name, body, mimetype)
+        # Fingerprinted names let browsers cache these forever
+        base, ext = os.path.splitext(name)
+        assets[f'{base}.{asset.digest}{ext}'] = asset
+
+    with open(os.path.join(ui_dir, 'index.html'), encoding='utf-8') as f:
+        page = minify_lines(f.read())
+    for url_name, asset in assets.items():
+        page = page.replace('/assets/' + asset.name, '/assets/' + url_name)
+
+    return Asset('index.html', page.encode('utf-8'), 'text/html'), assets